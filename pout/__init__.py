@@ -23,7 +23,15 @@ import functools
 
 from . import environ
 #from .compat import *
-from .utils import StderrStream
+from .utils import (
+    StderrStream,
+    BufferedStream,
+    QueueStream,
+    JsonStream,
+    RingStream,
+    FileStream,
+    MultiStream,
+)
 from .reflect import Call, Reflect
 from .interface import Interface
 from .value import Value
@@ -54,9 +62,45 @@ if len(logger.handlers) == 0:
         logger.addHandler(logging.NullHandler())
 
 
-# this is the pout printing logger, you can modify the logger this instance
-# uses or completely replace it to customize functionality
-stream = StderrStream()
+def create_stream(name):
+    """Returns the stream that matches name, see environ.STREAM
+
+    :param name: str, the stream name (eg, "buffered")
+    :returns: pout.utils.Stream
+    """
+    if name == "logging":
+        return StderrStream()
+
+    elif name == "queue":
+        return QueueStream()
+
+    elif name == "json":
+        if environ.JSON_PATH:
+            return JsonStream(FileStream(environ.JSON_PATH))
+
+        else:
+            return JsonStream()
+
+    elif name == "ring":
+        return JsonStream(RingStream(environ.RING_PATH))
+
+    else:
+        return BufferedStream()
+
+
+# this is the pout printing stream, you can completely replace it to customize
+# functionality, set POUT_STREAM=logging to print using the logging module or
+# POUT_STREAM=queue to print using a background thread, POUT_STREAM=json to
+# print JSON lines, or POUT_STREAM=ring to keep the latest calls in a file.
+# Separate names with commas (eg, POUT_STREAM=buffered,ring) to write to
+# more than one stream
+if "," in environ.STREAM:
+    stream = MultiStream(*(
+        create_stream(name.strip()) for name in environ.STREAM.split(",")
+    ))
+
+else:
+    stream = create_stream(environ.STREAM)
 
 
 def __getattr__(name):
@@ -81,6 +125,8 @@ def __getattr__(name):
     )
     func.__name__ = name
     func.__module__ = module
+    # interfaces can add helpers to their function (eg, pout.p.report())
+    func.__dict__.update(interface_class.get_function_attributes())
     return func
 
 
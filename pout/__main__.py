@@ -6,10 +6,11 @@ import os
 import argparse
 import logging
 import platform
+import json
 
 import pout
 from pout.path import SitePackagesDir, SiteCustomizeFile
-from pout.utils import String
+from pout.utils import String, RingStream
 
 
 level = logging.INFO
@@ -118,6 +119,46 @@ def main_info(args):
         logger.info("Pout injected: {}".format(filepath.is_injected()))
 
 
+def main_ring(args):
+    """Prints out the lines saved in a pout ring file, see RingStream
+
+    :param args: Namespace, the parsed CLI arguments passed into the application
+    :returns: int, the return code of the CLI
+    """
+    try:
+        for b in RingStream.read(args.path):
+            line = b.decode("UTF-8", errors="replace")
+            if not args.raw:
+                try:
+                    record = json.loads(line)
+
+                except ValueError:
+                    pass
+
+                else:
+                    if isinstance(record, dict) and "text" in record:
+                        meta = " ".join(
+                            String(record[k]) for k in [
+                                "timestamp",
+                                "pid",
+                                "thread",
+                                "task",
+                            ] if k in record
+                        )
+                        line = record["text"]
+                        if meta:
+                            line = "[{}]\n{}".format(meta, line)
+
+            logger.info(line)
+            logger.info("")
+
+    except (IOError, ValueError) as e:
+        logger.info(str(e))
+        return 1
+
+    return 0
+
+
 def main():
     #parser = argparse.ArgumentParser(description='Pout CLI', conflict_handler="resolve")
     parser = argparse.ArgumentParser(description='Pout CLI')
@@ -170,6 +211,24 @@ def main():
     )
     subparser.set_defaults(func=main_json)
 
+    # $ pout ring dump <PATH>
+    desc = "Print the lines saved in a ring buffer file (POUT_STREAM=ring)"
+    subparser = subparsers.add_parser(
+        "ring",
+        parents=[common_parser],
+        help=desc,
+        description=desc,
+        conflict_handler="resolve",
+    )
+    subparser.add_argument("action", choices=["dump"], help="what to do")
+    subparser.add_argument("path", help="the ring buffer file")
+    subparser.add_argument(
+        "--raw", "-r",
+        action="store_true",
+        help="print the saved lines as is",
+    )
+    subparser.set_defaults(func=main_ring)
+
     # $ pout info
     desc = "Print pout and python information"
     subparser = subparsers.add_parser(
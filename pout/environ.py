@@ -69,6 +69,25 @@ OBJECT_STRING_LIMIT = int(os.environ.get("POUT_OBJECT_STR_LIMIT", 500))
 """Limits the length of an object's __str__() method output"""
 
 
+STRING_LIMIT = int(os.environ.get("POUT_STRING_LIMIT", 100000))
+"""Limits how many characters of a string will be printed, if the string is
+longer than this then only the head and tail of the string will be printed.
+Set to 0 to print the whole string"""
+
+
+BYTES_LIMIT = int(os.environ.get("POUT_BYTES_LIMIT", 4096))
+"""Limits how many bytes of a bytes, bytearray, or memoryview will be printed,
+if the value is longer than this then only the head and tail of the value will
+be printed. Set to 0 to print the whole value"""
+
+
+INT_LIMIT = int(os.environ.get("POUT_INT_LIMIT", 1000))
+"""Integers with more decimal digits than this will be printed as a summary
+(bit length, sign, hex head and tail, and approximate decimal magnitude)
+instead of being converted to a full decimal string. Set to 0 to only
+summarize integers that are too big for python to convert to a string"""
+
+
 ITERATE_LIMIT = int(os.environ.get(
     "POUT_ITERATE_LIMIT",
     os.environ.get("POUT_ITERATOR_LIMIT", 101)
@@ -78,6 +97,76 @@ you want to print out. Turns out, after so many it becomes a pain to actually
 inspect the object"""
 
 
+TABLE_SAMPLE = int(os.environ.get("POUT_TABLE_SAMPLE", 100))
+"""When printing rows as a table this many rows will be used to decide the
+width of each column, after that each row is printed as it is formatted and
+values that are wider than their column are truncated"""
+
+
+STREAM = os.environ.get("POUT_STREAM", "buffered").lower()
+"""Which stream pout will write to, "buffered" writes directly to stderr's
+file descriptor through a buffer, "logging" writes through the logging module
+like pout always used to, "queue" writes using a background thread so slow
+stderr won't block the code calling pout, "json" writes each call as a
+JSON object on its own line, and "ring" writes each call as a JSON object into
+the RING_PATH ring buffer file. Separate names with commas (eg,
+"buffered,json") to write to all of them, see pout.utils.MultiStream"""
+
+
+BUFFER_SIZE = int(os.environ.get("POUT_BUFFER_SIZE", 65536))
+"""The buffered stream will write its buffer once it has this many bytes"""
+
+
+FLUSH_LINES = int(os.environ.get("POUT_FLUSH_LINES", 1))
+"""The buffered stream will write its buffer after this many lines, set to 0
+to only write when the buffer is full or the interpreter exits"""
+
+
+JSON_PATH = os.environ.get("POUT_JSON_PATH", "")
+"""If set, the json stream will write to this file instead of stderr"""
+
+
+RING_PATH = os.environ.get("POUT_RING_PATH", "pout.ring")
+"""The file the ring stream writes to, see pout.utils.RingStream"""
+
+
+RING_SIZE = int(os.environ.get("POUT_RING_SIZE", 8 * 1024 * 1024))
+"""How many bytes the ring stream will keep, once it has this many bytes the
+oldest lines are overwritten"""
+
+
+DEFERRED = bool(int(os.environ.get("POUT_DEFERRED", False)))
+"""Set to True to have pout.v() and friends take a snapshot of the values and
+render them in a background thread, see pout.interface.V.deferred_call"""
+
+
+PROFILE = bool(int(os.environ.get("POUT_PROFILE", True)))
+"""Set to False to turn off functions decorated with @pout.p, they will be
+called like they were never decorated"""
+
+
+PROFILE_AGGREGATE = bool(int(os.environ.get("POUT_PROFILE_AGGREGATE", False)))
+"""Set to True to have pout.p() collect statistics for each section instead
+of printing every section, the statistics are printed at exit or when
+pout.p.report() is called"""
+
+
+PROFILE_INTERVAL = float(os.environ.get("POUT_PROFILE_INTERVAL", 0))
+"""If set, the pout.p() statistics will also be printed whenever this many
+seconds have passed since they were last printed"""
+
+
+QUEUE_SIZE = int(os.environ.get("POUT_QUEUE_SIZE", 10000))
+"""How many lines the queue stream will hold before QUEUE_POLICY kicks in, 0
+means no limit"""
+
+
+QUEUE_POLICY = os.environ.get("POUT_QUEUE_POLICY", "block")
+"""What the queue stream does when its queue is full, "block" waits for room,
+"drop-oldest" throws away the oldest queued line, and "drop-newest" throws
+away the line being written"""
+
+
 #INDENT_STRING = os.environ.get("POUT_INDENT_STRING", "\t")
 #INDENT_STRING = os.environ.get("POUT_INDENT_STRING", "    ")
 #INDENT_STRING = os.environ.get("POUT_INDENT_STRING", "‧   ") # \u2027
@@ -149,7 +238,7 @@ else:
     )
 
 
-def has_color_support():
+def has_color_support(stream=None):
     """True if the environment has color support
 
     This is a simplified version of:
@@ -159,14 +248,30 @@ def has_color_support():
         - https://stackoverflow.com/questions/
         - https://stackoverflow.com/questions/7445658/
 
+    :param stream: io.IOBase, the stream to check, defaults to sys.stdout
     :returns: bool, True if the environment supports color
     """
     global SHOW_COLOR
 
+    return SHOW_COLOR and is_color_stream(stream or sys.stdout)
+
+
+def is_color_stream(stream):
+    """True if stream is a terminal that supports color, this ignores
+    SHOW_COLOR
+
+    :param stream: io.IOBase
+    :returns: bool
+    """
+    try:
+        isatty = stream.isatty()
+
+    except (AttributeError, ValueError):
+        # closed streams raise ValueError
+        isatty = False
+
     return (
-        SHOW_COLOR
-        and hasattr(sys.stdout, "isatty")
-        and sys.stdout.isatty()
+        isatty
         and (
             sys.platform != "win32"
             or "ANSICON" in os.environ
@@ -23,12 +23,28 @@ import traceback
 import functools
 import tempfile
 import webbrowser
+import asyncio
+import threading
+import datetime
+import contextvars
+import cProfile
+import pstats
+import tracemalloc
+import gc
+from concurrent.futures import ThreadPoolExecutor
 
 from .compat import *
 from . import environ
-from .value import Value
+from .value import Value, Snapshot
 from .path import Path
-from .utils import String, FileStream, Color
+from .utils import (
+    String,
+    FileStream,
+    RotatingFileStream,
+    Color,
+    Palette,
+    Histogram,
+)
 from .reflect import Call, Reflect
 
 
@@ -72,6 +88,21 @@ class Interface(object):
     RETURN_OUTPUT = False
     """If True then .output() will be returned"""
 
+    ASYNC_MODE = False
+    """If True then the call will be rendered and written in .executor and an
+    awaitable will be returned, see .async_call()"""
+
+    ASYNC_SUPPORTED = True
+    """False for interfaces that can't be rendered in .executor (eg, context
+    managers), passing in async_mode=True to them raises a ValueError"""
+
+    LEVEL = logging.DEBUG
+    """The logging level of this interface's output, streams like
+    pout.utils.MultiStream can use this to decide where the output goes"""
+
+    executor = None
+    """The executor async mode calls are ran in, see .get_executor()"""
+
     classes = {}
     """see .__init_subclass__"""
 
@@ -120,12 +151,62 @@ class Interface(object):
 
         with Reflect(module, module_function_name, args) as r:
             instance = instance_class(r, module.stream)
-            return instance(*args, **kwargs)
+            return instance.palette_call(*args, **kwargs)
+
+    def palette_call(self, *args, **kwargs):
+        """Call the instance using the colors the stream supports, see
+        pout.utils.Palette
+
+        :returns: mixed, whatever __call__ returns
+        """
+        if kwargs.get("async_mode") and not self.ASYNC_SUPPORTED:
+            raise ValueError(
+                "pout.{} does not support async_mode".format(
+                    kwargs.get("pout_function_name", self.function_name())
+                )
+            )
+
+        if get_palette := getattr(self.stream, "get_palette", None):
+            token = Palette.current.set(get_palette())
+            try:
+                return self(*args, **kwargs)
+
+            finally:
+                Palette.current.reset(token)
+
+        else:
+            return self(*args, **kwargs)
+
+    @classmethod
+    def get_executor(cls):
+        """Returns the executor async mode calls will run in
+
+        There is only one worker thread so the output of async calls will be
+        printed in the order the calls were made
+
+        :returns: concurrent.futures.Executor
+        """
+        if Interface.executor is None:
+            Interface.executor = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix="pout",
+            )
+
+        return Interface.executor
 
     def __init__(self, reflect, stream):
         self.reflect = reflect
         self.stream = stream
 
+    @classmethod
+    def get_function_attributes(cls):
+        """Returns attributes that will be set on the module function (eg,
+        pout.p.report)
+
+        :returns: dict
+        """
+        return {}
+
     def __init_subclass__(cls):
         """Called when a child class is loaded into memory
 
@@ -134,8 +215,78 @@ class Interface(object):
         cls.classes[cls.__name__.lower()] = cls
 
     def writeline(self, s):
-        """Actually write s to something using self.stream"""
-        self.stream.writeline(s)
+        """Actually write s to something using self.stream
+
+        If the stream has a .writerecord() method (eg, JsonStream) then it
+        will be passed .create_record(s) instead
+        """
+        if writerecord := getattr(self.stream, "writerecord", None):
+            writerecord(self.create_record(s))
+
+        else:
+            self.stream.writeline(s)
+
+    def get_caller(self):
+        """Returns the thread and asyncio task that made the pout call
+
+        :returns: dict
+        """
+        thread = threading.current_thread()
+        caller = {"thread": thread.name, "thread_id": thread.ident}
+
+        try:
+            task = asyncio.current_task()
+
+        except RuntimeError:
+            task = None
+
+        if task:
+            caller["task"] = task.get_name()
+
+        return caller
+
+    def create_record(self, s):
+        """Returns the structured information of this call, see
+        pout.utils.JsonStream
+
+        :param s: str, the rendered text
+        :returns: dict
+        """
+        info = self.reflect.info or {}
+        record = {
+            "timestamp": datetime.datetime.fromtimestamp(
+                getattr(self, "call_time", None) or time.time(),
+                datetime.timezone.utc
+            ).isoformat(),
+            "pid": os.getpid(),
+        }
+        record["level"] = logging.getLevelName(self.LEVEL)
+        record.update(getattr(self, "caller", None) or self.get_caller())
+        record["file"] = info.get("file")
+        record["line"] = info.get("line")
+        record["interface"] = getattr(
+            self.reflect,
+            "module_function_name",
+            type(self).__name__.lower()
+        )
+
+        args = []
+        for arg in info.get("args", []):
+            val_class = arg.get("val_class", type(arg["val"]))
+            if val_class.__module__ == "builtins":
+                val_type = val_class.__qualname__
+
+            else:
+                val_type = "{}.{}".format(
+                    val_class.__module__,
+                    val_class.__qualname__
+                )
+
+            args.append({"name": arg["name"], "type": val_type})
+
+        record["args"] = args
+        record["text"] = s
+        return record
 
     def writelines(self, ss):
         """Write a list of string to something using self.stream"""
@@ -145,6 +296,49 @@ class Interface(object):
     def _get_path(self, path):
         return self.path_class(path)
 
+    @classmethod
+    def table_value(cls, rows, rjust=()):
+        """Render rows as a plain aligned table, this is what the reports
+        (eg, pout.p statistics, pout.sample) use for their tables
+
+        Unlike `Value(rows, table=True)` the table isn't wrapped in a list,
+        every row is printed and no value is truncated
+
+        :param rows: list[dict], every row has the same keys in the same order
+        :param rjust: Collection[str], the columns to right align, numeric
+            columns are always right aligned
+        :returns: str
+        """
+        if not rows:
+            return ""
+
+        columns = list(rows[0].keys())
+        return Value(rows, iterate_limit=0, table_sample=0).table_value(
+            columns,
+            ([row[c] for c in columns] for row in rows),
+            rjust=rjust,
+        )
+
+    @classmethod
+    def get_size(cls, size, sign=False):
+        """Format size bytes using the largest unit that keeps at least one
+        whole unit
+
+        :param size: int|None
+        :param sign: bool, True to always add the sign (for deltas)
+        :returns: str, something like "+12.34 KB"
+        """
+        if size is None:
+            return "unknown"
+
+        prefix = "+" if sign and size >= 0 else ""
+        units = [("GB", 1 << 30), ("MB", 1 << 20), ("KB", 1 << 10)]
+        for unit, multiplier in units:
+            if abs(size) >= multiplier:
+                return "{}{:.2f} {}".format(prefix, size / multiplier, unit)
+
+        return "{}{} B".format(prefix, size)
+
     def _printstr(self, args):
         """this gets all the args ready to be printed, this is terribly named
         """
@@ -281,6 +475,9 @@ class Interface(object):
             bound keywords
         :returns: mixed, whatever you want module.<FUNCTION_NAME> to return
         """
+        if kwargs.pop("async_mode", self.ASYNC_MODE):
+            return self.async_call(*args, **kwargs)
+
         kwargs.setdefault("print_output", self.PRINT_OUTPUT)
         kwargs.setdefault("return_output", self.RETURN_OUTPUT)
 
@@ -290,6 +487,34 @@ class Interface(object):
 
         return s.strip() if kwargs["return_output"] else None
 
+    def async_call(self, *args, **kwargs):
+        """Render and write the call in .get_executor() so the event loop
+        isn't blocked
+
+        The call information was already found on the calling thread, so
+        only the rendering and writing happen in the executor. The values are
+        rendered when the executor gets to them, so if they are changed
+        after the call then the changed values might be printed
+
+        :param *args: mixed, the module.<FUNCTION_NAME> args
+        :param **kwargs: mixed, the module.<FUNCTION_NAME> kwargs
+        :returns: asyncio.Future, resolves to whatever __call__ returns
+        """
+        loop = asyncio.get_running_loop()
+        self.caller = self.get_caller()
+        self.call_time = time.time()
+        return loop.run_in_executor(
+            self.get_executor(),
+            functools.partial(
+                # copy the context so the executor uses the current palette
+                contextvars.copy_context().run,
+                self.__call__,
+                *args,
+                async_mode=False,
+                **kwargs
+            )
+        )
+
 
 class V(Interface):
     '''
@@ -320,6 +545,48 @@ class V(Interface):
     value_class = Value
     """the default class to use to introspect an input's value"""
 
+    DEFERRED = environ.DEFERRED
+    """If True then a snapshot of the values is taken and they are rendered
+    and written in a background thread, see .deferred_call()"""
+
+    def __call__(self, *args, **kwargs):
+        deferred = (
+            kwargs.pop("deferred", self.DEFERRED)
+            and not kwargs.get("return_output", self.RETURN_OUTPUT)
+            and not kwargs.get("async_mode", self.ASYNC_MODE)
+        )
+        if deferred:
+            return self.deferred_call(*args, **kwargs)
+
+        return super().__call__(*args, **kwargs)
+
+    def deferred_call(self, *args, **kwargs):
+        """Take a bounded snapshot of the values on the calling thread and
+        then render and write them in .get_executor()
+
+        The snapshot (see pout.value.Snapshot) is limited by the iterate and
+        object depth limits, so the caller only pays for copying what would
+        be printed, and changing the values after this returns won't change
+        what is printed
+
+        :returns: concurrent.futures.Future
+        """
+        memo = {}
+        for arg in self.reflect.info["args"]:
+            arg["val_class"] = type(arg["val"])
+            arg["val"] = Snapshot.create_safe(arg["val"], memo=memo, **kwargs)
+
+        self.caller = self.get_caller()
+        self.call_time = time.time()
+        return self.get_executor().submit(
+            functools.partial(
+                contextvars.copy_context().run,
+                super().__call__,
+                *args,
+                **kwargs
+            )
+        )
+
     def create_value(self, value, **kwargs):
         value_class = kwargs.get("value_class", self.value_class)
         return value_class(value, **kwargs)
@@ -379,6 +646,22 @@ class SS(S):
     SHOW_META = False
 
 
+class AV(V):
+    """exactly like v, but the value is rendered and printed in a background
+    thread and an awaitable is returned, so printing a big value doesn't block
+    the event loop
+
+    Any pout function that prints values can do this by passing in
+    `async_mode=True` (see Interface.ASYNC_SUPPORTED), so the
+    string returning version of this is `await pout.s(foo, async_mode=True)`
+
+    :example:
+        async def handler(request):
+            await pout.av(request)
+    """
+    ASYNC_MODE = True
+
+
 class X(V):
     '''same as v() but calls sys.exit() after printing values
 
@@ -394,7 +677,13 @@ class X(V):
                 "val": 'exit at line {}'.format(self.reflect.info["line"]),
             }]
 
+        # exiting can't wait on the event loop for an async call, so the
+        # values are always written before exiting
+        kwargs.pop("async_mode", None)
         super().__call__(*args, **kwargs)
+        if flush := getattr(self.stream, "flush", None):
+            flush()
+
         exit_code = int(kwargs.get("exit_code", kwargs.get("code", 1)))
         sys.exit(exit_code)
 
@@ -485,6 +774,8 @@ class Sleep(Interface):
 
     :param seconds: float|int, how many seconds to sleep
     """
+    ASYNC_SUPPORTED = False
+
     def __call__(self, seconds, **kwargs):
         if seconds <= 0.0:
             raise ValueError("Invalid seconds {}".format(seconds))
@@ -660,15 +951,56 @@ class J(V):
 
 class M(Interface):
     """
-    Print out memory usage at this point in time
+    Print out memory usage at this point in time, or how memory changed while
+    a with block ran
+
+    On Linux the current resident memory (RSS) is read from /proc/self/statm
+    and the proportional memory (PSS, shared pages are split between the
+    processes sharing them) from /proc/self/smaps_rollup, everywhere else
+    only the peak memory from resource.getrusage() is available
+
+    :Example:
+        pout.m("name")
+
+        with pout.m("name"):
+            foo()
 
     http://docs.python.org/2/library/resource.html
     http://stackoverflow.com/a/15448600/5006
     http://stackoverflow.com/questions/110259/which-python-memory-profiler-is-recommended
     """
-    def body_value(self, name, **kwargs):
+    ASYNC_SUPPORTED = False
+
+    @classmethod
+    def get_rss(cls):
+        """Returns the current resident memory in bytes, None if it isn't
+        available"""
+        try:
+            with open("/proc/self/statm", "rb") as fp:
+                return int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+        except (OSError, ValueError, AttributeError, IndexError):
+            return None
+
+    @classmethod
+    def get_pss(cls):
+        """Returns the current proportional memory in bytes, None if it isn't
+        available"""
+        try:
+            with open("/proc/self/smaps_rollup", "rb") as fp:
+                for line in fp:
+                    if line.startswith(b"Pss:"):
+                        return int(line.split()[1]) * 1024
+
+        except (OSError, ValueError):
+            pass
+
+    @classmethod
+    def get_max_rss(cls):
+        """Returns the peak resident memory of the process in bytes, None if
+        it isn't available"""
         if not resource:
-            return self._printstr(["UNSUPPORTED OS\n"])
+            return None
 
         usage = resource.getrusage(resource.RUSAGE_SELF)
         # according to the docs, this should give something good but it doesn't
@@ -677,20 +1009,396 @@ class M(Interface):
         # http://docs.python.org/2/library/resource.html#resource.getpagesize
         # (usage[2] * resource.getpagesize()) / (1024 * 1024)
         # http://stackoverflow.com/questions/5194057/better-way-to-convert-file-sizes-in-python
-        rss = 0.0
         platform_name = platform.system()
         if platform_name == 'Linux':
             # linux seems to return KB, while OSX returns B
-            rss = float(usage[2]) / 1024.0
+            return usage[2] * 1024
+
         else:
-            rss = float(usage[2]) / (1024.0 * 1024.0)
+            return usage[2]
 
-        summary = ''
-        if name:
-            summary += "{}: ".format(name)
+    def get_memory(self):
+        return {
+            "rss": self.get_rss(),
+            "pss": self.get_pss(),
+            "max_rss": self.get_max_rss(),
+        }
+
+    def is_with(self):
+        """Returns True if pout.m() was called in a with statement"""
+        call = String(self.reflect.info.get("call", "") or "").lstrip()
+        return call.startswith(("with ", "async with "))
+
+    def __call__(self, name="", interval_ms=10, **kwargs):
+        """Print the current memory, or if called as a context manager print
+        how memory changed while the with block ran
+
+        :param name: str, the name to print with the memory
+        :param interval_ms: int|float, in a with block the memory is sampled
+            by a background thread every this many milliseconds to find the
+            peak memory of the block
+        :returns: M|str, so it can be used as a context manager, the output
+            if return_output is True
+        """
+        self.name = name
+        self.interval = interval_ms / 1000.0
+        self.kwargs = kwargs
+        if not self.is_with():
+            ret = super().__call__(name, **kwargs)
+            if kwargs.get("return_output", self.RETURN_OUTPUT):
+                return ret
+
+        return self
+
+    def __enter__(self):
+        self.before = self.get_memory()
+        self.peak = self.before["rss"]
+        self.done = threading.Event()
+        self.thread = None
+        if self.peak is not None:
+            self.thread = threading.Thread(
+                target=self.run,
+                name="pout-memory",
+                daemon=True,
+            )
+            self.thread.start()
+
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.done.set()
+        if self.thread:
+            self.thread.join()
+
+        self.after = self.get_memory()
+        peaks = [self.peak, self.after["rss"]]
+        if self.after["max_rss"] != self.before["max_rss"]:
+            # the process reached a new peak during the block
+            peaks.append(self.after["max_rss"])
+
+        peaks = [p for p in peaks if p is not None]
+        self.peak = max(peaks) if peaks else None
+        self.writeline(self.output(**self.kwargs))
+
+    def run(self):
+        """Runs in the sampling thread until the with block is done"""
+        while not self.done.wait(self.interval):
+            if (rss := self.get_rss()) is not None and rss > self.peak:
+                self.peak = rss
+
+    def body_value(self, name, **kwargs):
+        summary = ""
+        if self.name:
+            summary += "{}: ".format(self.name)
+
+        if after := getattr(self, "after", None):
+            before = self.before
+            lines = []
+            for k in ["rss", "pss"]:
+                if before[k] is not None and after[k] is not None:
+                    lines.append("{} {} -> {} ({})".format(
+                        k,
+                        self.get_size(before[k]),
+                        self.get_size(after[k]),
+                        self.get_size(after[k] - before[k], sign=True),
+                    ))
+
+            lines.append("peak {}".format(self.get_size(self.peak)))
+            summary += ", ".join(lines)
+
+        else:
+            memory = self.get_memory()
+            if memory["max_rss"] is None and memory["rss"] is None:
+                return self._printstr(["UNSUPPORTED OS\n"])
+
+            lines = []
+            for k in ["rss", "pss", "max_rss"]:
+                if memory[k] is not None:
+                    lines.append("{} {}".format(
+                        k.replace("_", " "),
+                        self.get_size(memory[k])
+                    ))
 
-        summary += "{0} mb\n".format(round(rss, 2))
-        return summary
+            summary += ", ".join(lines)
+
+        return summary + "\n"
+
+
+class Alloc(Interface):
+    """Allocation diff context manager used in pout.alloc()
+
+    tracemalloc is started if it isn't already tracing and a snapshot is
+    taken before and after the with block, the allocations that grew the most
+    are printed. Allocations made by pout itself are ignored
+
+    :Example:
+        with pout.alloc():
+            foo()
+
+        # group by the stack that made the allocation and only count
+        # allocations that were made while code in the project was running
+        with pout.alloc(group_by="traceback", paths=["/project"]):
+            foo()
+    """
+    ASYNC_SUPPORTED = False
+    LEVEL = logging.INFO
+
+    def get_filters(self):
+        """Returns the tracemalloc filters that remove pout's allocations and
+        limit the allocations to .paths
+
+        :returns: list[tracemalloc.Filter]
+        """
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(
+                False,
+                os.path.join(os.path.dirname(__file__), "*")
+            ),
+        ]
+
+        for path in self.paths:
+            # every frame is checked so allocations made by libraries that
+            # were called from the project are counted
+            filters.append(tracemalloc.Filter(
+                True,
+                os.path.join(os.path.abspath(path), "*"),
+                all_frames=True,
+            ))
+
+        return filters
+
+    def __enter__(self):
+        self.started = not tracemalloc.is_tracing()
+        if self.started:
+            tracemalloc.start(self.frames)
+
+        self.before = tracemalloc.take_snapshot().filter_traces(
+            self.get_filters()
+        )
+        self.traced = tracemalloc.get_traced_memory()
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.after = tracemalloc.take_snapshot().filter_traces(
+            self.get_filters()
+        )
+        current, self.peak = tracemalloc.get_traced_memory()
+        self.traced = (self.traced[0], current)
+        if self.started:
+            tracemalloc.stop()
+
+        self.writeline(self.output(**self.kwargs))
+
+    def get_location(self, frame):
+        return "{}:{}".format(self._get_path(frame.filename), frame.lineno)
+
+    def top_value(self, stats):
+        """Returns the allocations that grew the most
+
+        :param stats: list[tracemalloc.StatisticDiff]
+        :returns: str
+        """
+        if self.group_by == "traceback":
+            lines = []
+            for i, stat in enumerate(stats, 1):
+                lines.append("{}. {} ({:+} blocks)".format(
+                    i,
+                    self.get_size(stat.size_diff, sign=True),
+                    stat.count_diff,
+                ))
+
+                # the most recent frame is printed last like a python
+                # traceback
+                for frame in stat.traceback:
+                    lines.append("{}{}".format(
+                        environ.INDENT_STRING,
+                        self.get_location(frame)
+                    ))
+
+            return "\n".join(lines)
+
+        rows = []
+        for stat in stats:
+            frame = stat.traceback[0]
+            rows.append({
+                "size": self.get_size(stat.size_diff, sign=True),
+                "blocks": "{:+}".format(stat.count_diff),
+                "total": self.get_size(stat.size),
+                "location": (
+                    self._get_path(frame.filename)
+                    if self.group_by == "filename"
+                    else self.get_location(frame)
+                ),
+            })
+
+        return self.table_value(rows, rjust=["size", "blocks", "total"])
+
+    def body_value(self, *args, **kwargs):
+        stats = self.after.compare_to(self.before, self.group_by)
+        stats = [stat for stat in stats if stat.size_diff > 0][:self.top]
+
+        size_diff = sum(
+            stat.size_diff
+            for stat in self.after.compare_to(self.before, "filename")
+        )
+        summary = "{} net, traced {} -> {}".format(
+            self.get_size(size_diff, sign=True),
+            self.get_size(self.traced[0]),
+            self.get_size(self.traced[1]),
+        )
+        if self.started:
+            # the peak is only for the block if pout started tracing
+            summary += ", peak {}".format(self.get_size(self.peak))
+
+        if self.name:
+            summary = "{}: {}".format(self.name, summary)
+
+        if stats:
+            return "{}\n\n{}".format(summary, self.top_value(stats))
+
+        else:
+            return summary
+
+    def __call__(
+        self,
+        name="",
+        top=20,
+        group_by="lineno",
+        paths=None,
+        frames=0,
+        **kwargs
+    ):
+        """Print the allocations that grew while the with block ran
+
+        :param name: str, the name to print with the allocations
+        :param top: int, how many allocations to print
+        :param group_by: str, "lineno" to group the allocations by file and
+            line, "filename" to group them by file, or "traceback" to group
+            them by the stack that made the allocation
+        :param paths: str|list[str], only count allocations that were made
+            while code under these directories was running
+        :param frames: int, how many frames tracemalloc keeps for each
+            allocation if pout starts tracemalloc, defaults to 1, or 10 when
+            grouping by traceback or limiting to paths
+        :returns: context manager
+        """
+        if group_by not in ("lineno", "filename", "traceback"):
+            raise ValueError("Unknown group_by {}".format(group_by))
+
+        if isinstance(paths, basestring):
+            paths = [paths]
+
+        self.name = name
+        self.top = top
+        self.group_by = group_by
+        self.paths = paths or []
+        self.frames = frames or (
+            10 if group_by == "traceback" or self.paths else 1
+        )
+        kwargs.setdefault("show_path", False)
+        self.kwargs = kwargs
+        return self
+
+
+class GC(Interface):
+    """Garbage collector context manager used in pout.gc()
+
+    A gc.callbacks hook times every collection that happens while the with
+    block runs. Collections are process wide, so a collection that was
+    triggered by another thread during the block is also counted
+
+    :Example:
+        with pout.gc():
+            foo()
+    """
+    ASYNC_SUPPORTED = False
+    LEVEL = logging.INFO
+
+    def __enter__(self):
+        self.generations = {}
+        self.collect_start = None
+        self.start = time.perf_counter_ns()
+        gc.callbacks.append(self.callback)
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        gc.callbacks.remove(self.callback)
+        self.stop = time.perf_counter_ns()
+        self.writeline(self.output(**self.kwargs))
+
+    def callback(self, phase, info):
+        """Called by the garbage collector before and after each collection
+
+        :param phase: str, "start" or "stop"
+        :param info: dict, has the generation being collected and, when
+            stopping, how many objects were collected and uncollectable
+        """
+        if phase == "start":
+            self.collect_start = time.perf_counter_ns()
+
+        elif self.collect_start is not None:
+            pause = time.perf_counter_ns() - self.collect_start
+            self.collect_start = None
+
+            stats = self.generations.setdefault(info["generation"], {
+                "collections": 0,
+                "total": 0,
+                "max": 0,
+                "collected": 0,
+                "uncollectable": 0,
+            })
+            stats["collections"] += 1
+            stats["total"] += pause
+            stats["max"] = max(stats["max"], pause)
+            stats["collected"] += info["collected"]
+            stats["uncollectable"] += info["uncollectable"]
+
+    def body_value(self, *args, **kwargs):
+        stats = self.generations.values()
+        collections = sum(s["collections"] for s in stats)
+        summary = "{} collections over {}".format(
+            collections,
+            P.get_duration(self.stop - self.start),
+        )
+        if self.name:
+            summary = "{}: {}".format(self.name, summary)
+
+        if not collections:
+            return summary
+
+        summary += ", pause {} total, {} max".format(
+            P.get_duration(sum(s["total"] for s in stats)),
+            P.get_duration(max(s["max"] for s in stats)),
+        )
+
+        rows = []
+        for generation, s in sorted(self.generations.items()):
+            rows.append({
+                "generation": generation,
+                "collections": s["collections"],
+                "total pause": P.get_duration(s["total"]),
+                "max pause": P.get_duration(s["max"]),
+                "collected": s["collected"],
+                "uncollectable": s["uncollectable"],
+            })
+
+        return "{}\n\n{}".format(
+            summary,
+            self.table_value(rows, rjust=["total pause", "max pause"])
+        )
+
+    def __call__(self, name="", **kwargs):
+        """Print the garbage collections that happened while the with block
+        ran
+
+        :param name: str, the name to print with the collections
+        :returns: context manager
+        """
+        self.name = name
+        kwargs.setdefault("show_path", False)
+        self.kwargs = kwargs
+        return self
 
 
 class E(Interface):
@@ -705,6 +1413,9 @@ class E(Interface):
 
     https://github.com/Jaymon/pout/issues/59
     """
+    ASYNC_SUPPORTED = False
+    LEVEL = logging.ERROR
+
     def body_value(self, *args, **kwargs):
         lines = traceback.format_exception(
             self.exc_type,
@@ -734,34 +1445,263 @@ class E(Interface):
 class P(Interface):
     """this is a context manager for Profiling
 
+    The wall time is measured with time.perf_counter_ns() and the process and
+    thread cpu times are measured alongside it. The cost of reading the clocks
+    is measured once (see .get_overhead()) and subtracted from every section
+    so sections that take microseconds are reported accurately
+
     see -- p()
     since -- 10-21-2015
     """
+    ASYNC_SUPPORTED = False
+    LEVEL = logging.INFO
+
+    stack = contextvars.ContextVar("pout_profile_stack", default=())
+    """Holds the started profiles, each thread and asyncio task has its own
+    stack so concurrent profiles don't nest under each other. A task starts
+    with the stack of the code that created it"""
+
+    overhead = None
+    """Holds the (wall, process, thread) nanoseconds it takes to read the
+    clocks, see .get_overhead()"""
+
+    CALIBRATE_COUNT = 1000
+    """How many times the clocks are read to find the overhead"""
+
+    AGGREGATE = environ.PROFILE_AGGREGATE
+    """If True then sections aren't printed, instead statistics are kept for
+    each section name and printed with .report()"""
+
+    REPORT_INTERVAL = environ.PROFILE_INTERVAL
+    """If set, .report() will be called when a section finishes and it has
+    been at least this many seconds since the last report"""
+
+    ENABLED = environ.PROFILE
+    """If False then functions decorated with @pout.p will just call the
+    function, this can be changed at any time to turn the decorators off"""
 
-    # profiler p() state is held here
-    stack = []
+    stats = {}
+    """Holds a pout.utils.Histogram of the wall nanoseconds for each section
+    name when aggregating"""
+
+    stats_lock = threading.Lock()
+
+    reported = None
+    """When the statistics were last reported"""
+
+    @classmethod
+    def get_function_attributes(cls):
+        return {"report": cls.report}
 
     @classmethod
-    def pop(cls, reflect=None):
-        instance = cls.stack[-1]
-        instance.stop(reflect.info)
-        cls.stack.pop(-1)
+    def add_stats(cls, name, wall_ns):
+        """Add a finished section to the statistics
+
+        :param name: str, the section name
+        :param wall_ns: int, how long the section took
+        """
+        with cls.stats_lock:
+            if not cls.stats and cls.reported is None:
+                # the first time a section is aggregated
+                cls.reported = time.time()
+                atexit.register(cls.report)
+
+            if name not in cls.stats:
+                cls.stats[name] = Histogram()
+
+            cls.stats[name].add(wall_ns)
+
+        if cls.REPORT_INTERVAL:
+            if time.time() - cls.reported >= cls.REPORT_INTERVAL:
+                cls.report()
+
+    @classmethod
+    def report(cls, reset=False):
+        """Print a table of the aggregated section statistics
+
+        :param reset: bool, True to clear the statistics after printing them
+        """
+        with cls.stats_lock:
+            stats = cls.stats
+            if reset:
+                cls.stats = {}
+
+            rows = [
+                {
+                    "name": name,
+                    "count": h.count,
+                    "total": cls.get_duration(h.total),
+                    "mean": cls.get_duration(int(h.mean)),
+                    "min": cls.get_duration(h.min),
+                    "p50": cls.get_duration(int(h.percentile(50))),
+                    "p95": cls.get_duration(int(h.percentile(95))),
+                    "p99": cls.get_duration(int(h.percentile(99))),
+                    "max": cls.get_duration(h.max),
+                } for name, h in stats.items()
+            ]
+            cls.reported = time.time()
+
+        if not rows:
+            return
+
+        lines = [
+            "",
+            Color.color_header("pout.p statistics"),
+            cls.table_value(
+                rows,
+                rjust=["total", "mean", "min", "p50", "p95", "p99", "max"]
+            ),
+            "",
+        ]
+
+        try:
+            cls.get_module().stream.writeline("\n".join(lines))
+
+        except (OSError, ValueError):
+            # the stream could be closed at exit
+            pass
+
+    @classmethod
+    def create_instance(cls, *args, **kwargs):
+        """Reflecting the call is slow, so this reads the clocks before the
+        call is reflected (for stopping a profile) and after (for starting a
+        profile) so the profile isn't charged for pout figuring out the call
+        """
+        clocks = cls.get_stop_clocks()
+        stopping = not args and "name" not in kwargs
+        if stopping:
+            # pout.p() will stop the last section so stop its profiler before
+            # the call is reflected
+            if stack := cls.stack.get():
+                stack[-1].stop_profiler()
+
+        module = kwargs["pout_module"]
+        module_function_name = kwargs["pout_function_name"]
+        instance_class = kwargs["pout_interface_class"]
+
+        with Reflect(module, module_function_name, args) as r:
+            instance = instance_class(r, module.stream)
+            instance = instance.palette_call(
+                *args,
+                pout_clocks=clocks,
+                **kwargs
+            )
+
+        if not stopping and getattr(instance, "start_clocks", None):
+            instance.restart()
+
+        return instance
+
+    @classmethod
+    def get_start_clocks(cls):
+        """Returns the current (wall, process, thread) nanoseconds, the wall
+        clock is read last so it is as close to the profiled code as possible
+
+        :returns: tuple[int, int, int]
+        """
+        process = time.process_time_ns()
+        thread = time.thread_time_ns()
+        return (time.perf_counter_ns(), process, thread)
+
+    @classmethod
+    def get_stop_clocks(cls):
+        """Returns the current (wall, process, thread) nanoseconds, the wall
+        clock is read first so it is as close to the profiled code as possible
+
+        :returns: tuple[int, int, int]
+        """
+        wall = time.perf_counter_ns()
+        return (wall, time.process_time_ns(), time.thread_time_ns())
+
+    @classmethod
+    def get_overhead(cls):
+        """Returns how many nanoseconds of each clock it takes to start and
+        stop a section with nothing in it
+
+        This is measured the first time it is needed by reading the start and
+        stop clocks back to back .CALIBRATE_COUNT times and keeping the
+        smallest difference of each clock
+
+        :returns: tuple[int, int, int], (wall, process, thread)
+        """
+        if cls.overhead is None:
+            overhead = None
+            for _ in range(cls.CALIBRATE_COUNT):
+                start = cls.get_start_clocks()
+                stop = cls.get_stop_clocks()
+                diff = tuple(b - a for a, b in zip(start, stop))
+                if overhead is None:
+                    overhead = diff
+
+                else:
+                    overhead = tuple(map(min, overhead, diff))
+
+            P.overhead = overhead
+
+        return cls.overhead
+
+    @classmethod
+    def pop(cls, reflect=None, clocks=None):
+        stack = cls.stack.get()
+        instance = stack[-1]
+        instance.stop(reflect.info, clocks=clocks)
+        cls.stack.set(stack[:-1])
         return instance
 
     def start(self, name, call_info, **kwargs):
-        self.start = time.time()
+        self.get_overhead()
+        self.aggregate = kwargs.pop("aggregate", self.AGGREGATE)
+        self.profiler = None
+        if kwargs.pop("profile", False) and not self.aggregate:
+            self.profiler = cProfile.Profile()
+            self.profiling = False
+            self.top = kwargs.pop("top", 20)
+            self.prof_path = kwargs.pop("prof_path", "")
+
         self.name = name
         self.start_call_info = call_info
+        self.nested = kwargs.pop("nested", True)
         self.kwargs = kwargs
-        type(self).stack.append(self)
+        if self.nested:
+            self.stack.set(self.stack.get() + (self,))
+
+        self.start_time = time.time()
+        self.start_clocks = self.get_start_clocks()
+
+    def restart(self):
+        """Start the clocks (and the profiler if profiling) again, this is
+        called right before the profiled code runs"""
+        if self.profiler and not self.profiling:
+            try:
+                self.profiler.enable()
+                self.profiling = True
+
+            except ValueError:
+                # only one profiler can run at a time
+                logger.warning(
+                    "Could not profile %s, another profiler is active",
+                    self.name
+                )
+                self.profiler = None
+
+        self.start_clocks = self.get_start_clocks()
+
+    def stop_profiler(self):
+        if getattr(self, "profiler", None) and self.profiling:
+            self.profiler.disable()
+            self.profiling = False
+
+    def stop(self, call_info=None, clocks=None):
+        clocks = clocks or self.get_stop_clocks()
+        self.stop_profiler()
+        self.stop_time = time.time()
 
-    def stop(self, call_info=None):
-        pr_class = type(self)
         name = self.name
-        if len(pr_class.stack) > 0:
+        stack = self.stack.get() if self.nested else ()
+        if len(stack) > 0:
             found = False
             ds = []
-            for d in pr_class.stack:
+            for d in stack:
                 if self is d:
                     found = True
                     break
@@ -775,25 +1715,43 @@ class P(Interface):
 
         self.stop_call_info = call_info or self.reflect.info
         self.name = name
-        self.stop = time.time()
-        self.elapsed = self.get_elapsed(self.start, self.stop, 1000.00, 1)
-        self.total = "{:.1f} ms".format(self.elapsed)
+
+        self.wall_ns, self.process_ns, self.thread_ns = (
+            max(0, stop - start - overhead)
+            for start, stop, overhead in zip(
+                self.start_clocks,
+                clocks,
+                self.get_overhead()
+            )
+        )
+        self.elapsed = self.wall_ns / 1000000.0
+        self.total = self.get_duration(self.wall_ns)
 
     def __enter__(self):
+        self.restart()
         return self
 
     def __exit__(self, *args, **kwargs):
-        pr_class = type(self)
-        for i in range(len(pr_class.stack)):
-            if self is pr_class.stack[i]:
-                self.stop()
-                pr_class.stack.pop(i)
+        clocks = self.get_stop_clocks()
+        self.stop_profiler()
+        if not self.nested:
+            self.stop(clocks=clocks)
+
+        stack = self.stack.get()
+        for i in range(len(stack)):
+            if self is stack[i]:
+                self.stop(clocks=clocks)
+                self.stack.set(stack[:i] + stack[i + 1:])
                 break
 
         self.finish()
 
     def finish(self):
-        self.writeline(self.output(**self.kwargs))
+        if self.aggregate:
+            self.add_stats(self.name, self.wall_ns)
+
+        else:
+            self.writeline(self.output(**self.kwargs))
 
     def body_value(self, *args, **kwargs):
         s = ""
@@ -802,26 +1760,176 @@ class P(Interface):
 
         summary = []
         summary.append("{} - {}".format(self.name, self.total))
+        summary.append("  cpu: {} process, {} thread".format(
+            self.get_duration(self.process_ns),
+            self.get_duration(self.thread_ns),
+        ))
         summary.append("  start: {} ({}:{})".format(
-            self.start,
+            self.start_time,
             self._get_path(start_call_info['file']),
             start_call_info['line']
         ))
 
         if stop_call_info:
             summary.append("  stop: {} ({}:{})".format(
-                self.stop,
+                self.stop_time,
                 self._get_path(stop_call_info['file']),
                 stop_call_info['line']
             ))
 
         else:
-            summary.append("  stop: {}".format(self.stop))
+            summary.append("  stop: {}".format(self.stop_time))
+
+        if self.profiler:
+            summary.append(self.profile_value())
 
         return "\n".join(summary)
 
-    def get_elapsed(self, start, stop, multiplier, rnd):
-        return round(abs(stop - start) * float(multiplier), rnd)
+    def profile_value(self):
+        """Returns tables of the functions that took the most cumulative and
+        self time while the section was being profiled
+
+        :returns: str
+        """
+        pout_dir = os.path.dirname(__file__)
+        stats = pstats.Stats(self.profiler).stats
+        rows = []
+        for (path, line, func), (cc, nc, tt, ct, callers) in stats.items():
+            if path.startswith(pout_dir) or (callers and all(
+                caller[0].startswith(pout_dir) for caller in callers
+            )):
+                # pout starting and stopping the section
+                continue
+
+            if path == "~" and line == 0:
+                # builtins like {built-in method time.sleep}
+                function = func
+
+            else:
+                function = "{} ({}:{})".format(func, self._get_path(path), line)
+
+            rows.append({
+                "calls": str(nc) if nc == cc else "{}/{}".format(nc, cc),
+                "cumulative": ct,
+                "self": tt,
+                "function": function,
+            })
+
+        ret = []
+        for header, key in [("Cumulative", "cumulative"), ("Self", "self")]:
+            ret.append(Color.color_header(
+                "{} (top {} by {} time)".format(header, self.top, key)
+            ))
+            ret.append(
+                self.table_value(
+                    [
+                        dict(
+                            row,
+                            cumulative=self.get_duration(
+                                int(row["cumulative"] * 1e9)
+                            ),
+                            self=self.get_duration(int(row["self"] * 1e9)),
+                        ) for row in sorted(
+                            rows,
+                            key=lambda row: row[key],
+                            reverse=True
+                        )[:self.top]
+                    ],
+                    rjust=["calls", "cumulative", "self"]
+                )
+            )
+
+        if self.prof_path:
+            self.profiler.dump_stats(self.prof_path)
+            ret.append("Profile written to {}".format(self.prof_path))
+
+        return "\n\n" + "\n".join(ret)
+
+    def decorate(self, func):
+        """Wrap func so every call is added to the statistics, see .report()
+
+        The call was reflected when func was decorated, so calling the
+        wrapper only costs starting and stopping a section, and if .ENABLED is
+        False then the wrapper only checks .ENABLED before calling func
+
+        The statistics are kept under the function's name no matter where it
+        is called from, the section isn't added to .stack, and a recursive
+        call is counted once as part of the outermost call
+
+        :param func: callable, the function or coroutine function to wrap
+        :returns: callable
+        """
+        if getattr(self, "start_clocks", None):
+            # @pout.p("name") started a section when it was called, so that
+            # section is thrown away and its name is used for every call
+            name = self.name
+            self.stop_profiler()
+            stack = self.stack.get()
+            self.stack.set(tuple(d for d in stack if d is not self))
+
+        else:
+            name = func.__qualname__
+
+        if not self.ENABLED:
+            return func
+
+        pr_class = type(self)
+        reflect = self.reflect
+        stream = self.stream
+
+        running = contextvars.ContextVar(
+            "pout_profile_running",
+            default=False
+        )
+
+        def create_instance():
+            instance = pr_class(reflect, stream)
+            instance.start(name, reflect.info, aggregate=True, nested=False)
+            return instance
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not pr_class.ENABLED or running.get():
+                    return await func(*args, **kwargs)
+
+                token = running.set(True)
+                try:
+                    with create_instance():
+                        return await func(*args, **kwargs)
+
+                finally:
+                    running.reset(token)
+
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not pr_class.ENABLED or running.get():
+                    return func(*args, **kwargs)
+
+                token = running.set(True)
+                try:
+                    with create_instance():
+                        return func(*args, **kwargs)
+
+                finally:
+                    running.reset(token)
+
+        return wrapper
+
+    @classmethod
+    def get_duration(cls, ns):
+        """Format nanoseconds using the largest unit that keeps at least one
+        whole unit
+
+        :param ns: int, nanoseconds
+        :returns: str, something like "12.345 us"
+        """
+        for unit, multiplier in [("s", 1e9), ("ms", 1e6), ("us", 1e3)]:
+            if ns >= multiplier:
+                return "{:.3f} {}".format(ns / multiplier, unit)
+
+        return "{} ns".format(ns)
 
     def __call__(self, name="", **kwargs):
         '''
@@ -851,20 +1959,289 @@ class P(Interface):
             with pout.p("three"):
                 time.sleep(0.5)
 
+            # keep statistics instead of printing every section, the
+            # statistics are printed at exit or with pout.p.report()
+            for i in range(1000):
+                with pout.p("four", aggregate=True):
+                    time.sleep(0.001)
+
+            # add every call of a function to the statistics
+            @pout.p
+            def five():
+                time.sleep(0.001)
+
+            # print the functions that took the most time
+            with pout.p("six", profile=True, top=10, prof_path="six.prof"):
+                time.sleep(0.5)
+
         name -- string -- pass this in to start a profiling session
+        aggregate -- bool -- True to add the section to the statistics
+        profile -- bool -- True to run the section with cProfile
+        top -- int -- how many functions to print when profiling
+        prof_path -- string -- write the cProfile stats to this file
         return -- context manager
         '''
         kwargs.setdefault("show_path", False)
+        clocks = kwargs.pop("pout_clocks", None)
+        if callable(name):
+            # @pout.p or @pout.p("name")
+            return self.decorate(name)
+
         if name:
             self.start(name, self.reflect.info, **kwargs)
             instance = self
         else:
-            instance = type(self).pop(self.reflect)
+            instance = type(self).pop(self.reflect, clocks=clocks)
             instance.finish()
 
         return instance
 
 
+class Sample(Interface):
+    """Sampling profiler context manager used in pout.sample()
+
+    A background thread looks at the stack of the profiled thread every
+    interval using sys._current_frames() and counts how many times each stack
+    was seen. The profiled code isn't traced so it runs at close to full speed
+
+    :Example:
+        with pout.sample():
+            foo()
+
+        # write flamegraph compatible collapsed stacks to a file
+        with pout.sample(path="/tmp/foo.folded"):
+            foo()
+    """
+    ASYNC_SUPPORTED = False
+    LEVEL = logging.INFO
+
+    switch_lock = threading.Lock()
+    """Protects .switch_intervals and .switch_interval"""
+
+    switch_intervals = []
+    """The sampling intervals of the samplers that are currently running"""
+
+    switch_interval = None
+    """The switch interval before the first running sampler lowered it"""
+
+    @classmethod
+    def lower_switch_interval(cls, interval):
+        """The sampling thread can only take a sample when it gets the GIL, so
+        the switch interval is lowered to the smallest sampling interval of
+        every running sampler
+
+        :param interval: float, the sampling interval in seconds
+        """
+        with Sample.switch_lock:
+            if not Sample.switch_intervals:
+                Sample.switch_interval = sys.getswitchinterval()
+
+            Sample.switch_intervals.append(interval)
+            sys.setswitchinterval(
+                min([Sample.switch_interval] + Sample.switch_intervals)
+            )
+
+    @classmethod
+    def restore_switch_interval(cls, interval):
+        """Undo .lower_switch_interval, the original switch interval is only
+        restored when the last running sampler stops
+
+        :param interval: float, the interval passed to .lower_switch_interval
+        """
+        with Sample.switch_lock:
+            Sample.switch_intervals.remove(interval)
+            sys.setswitchinterval(
+                min([Sample.switch_interval] + Sample.switch_intervals)
+            )
+
+    def __enter__(self):
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.done = threading.Event()
+        self.thread_ids = set([threading.get_ident()])
+        self.thread = threading.Thread(
+            target=self.run,
+            name="pout-sample",
+            daemon=True,
+        )
+        self.lower_switch_interval(self.interval)
+
+        self.start = time.perf_counter()
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.done.set()
+        self.thread.join()
+        self.stop = time.perf_counter()
+        self.restore_switch_interval(self.interval)
+        self.writeline(self.output(**self.kwargs))
+
+    def run(self):
+        """Runs in the sampling thread until the with block is done"""
+        sampler_id = threading.get_ident()
+        while not self.done.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == sampler_id:
+                    continue
+
+                if self.all_threads or thread_id in self.thread_ids:
+                    if stack := self.get_stack(frame):
+                        self.stacks[stack] += 1
+
+            self.samples += 1
+
+    def get_stack(self, frame):
+        """Returns the stack of frame from the outermost call to frame
+
+        :param frame: types.FrameType
+        :returns: tuple[tuple[types.CodeType, int]]|None, the code and line
+            number of each frame, None if the sample was taken while the with
+            block was starting or stopping
+        """
+        ignore_codes = (Sample.__enter__.__code__, Sample.__exit__.__code__)
+        stack = []
+        while frame:
+            if frame.f_code in ignore_codes:
+                return None
+
+            stack.append((frame.f_code, frame.f_lineno))
+            frame = frame.f_back
+
+        stack.reverse()
+        return tuple(stack)
+
+    def get_function_name(self, code):
+        return "{} ({})".format(
+            getattr(code, "co_qualname", code.co_name),
+            self._get_path(code.co_filename),
+        )
+
+    def get_line_name(self, code, lineno):
+        return "{} ({}:{})".format(
+            getattr(code, "co_qualname", code.co_name),
+            self._get_path(code.co_filename),
+            lineno,
+        )
+
+    def collapsed_value(self):
+        """Returns the stacks in the collapsed format used by flamegraph.pl
+        and speedscope, one "frame;frame;frame count" line per stack
+
+        :returns: str
+        """
+        lines = []
+        for stack, count in self.stacks.most_common():
+            lines.append("{} {}".format(
+                ";".join(self.get_line_name(*f) for f in stack),
+                count
+            ))
+
+        return "\n".join(lines)
+
+    def top_value(self):
+        """Returns tables of the functions and lines that were seen the most
+
+        :returns: str
+        """
+        total = sum(self.stacks.values()) or 1
+        functions = collections.Counter()
+        function_totals = collections.Counter()
+        lines = collections.Counter()
+        for stack, count in self.stacks.items():
+            if stack:
+                code, lineno = stack[-1]
+                functions[code] += count
+                lines[(code, lineno)] += count
+
+            for code in set(f[0] for f in stack):
+                function_totals[code] += count
+
+        function_rows = []
+        codes = set(functions) | set(function_totals)
+        for code in sorted(
+            codes,
+            key=lambda c: (functions[c], function_totals[c]),
+            reverse=True
+        )[:self.top]:
+            function_rows.append({
+                "self": functions[code],
+                "self %": round(functions[code] * 100.0 / total, 1),
+                "total": function_totals[code],
+                "total %": round(function_totals[code] * 100.0 / total, 1),
+                "function": self.get_function_name(code),
+            })
+
+        line_rows = []
+        for (code, lineno), count in lines.most_common(self.top):
+            line_rows.append({
+                "self": count,
+                "self %": round(count * 100.0 / total, 1),
+                "line": self.get_line_name(code, lineno),
+            })
+
+        ret = []
+        for header, rows in [("Functions", function_rows), ("Lines", line_rows)]:
+            if rows:
+                ret.append(Color.color_header(header))
+                ret.append(self.table_value(rows))
+
+        return "\n".join(ret)
+
+    def body_value(self, *args, **kwargs):
+        summary = "{} samples every {} over {}".format(
+            self.samples,
+            P.get_duration(int(self.interval * 1e9)),
+            P.get_duration(int((self.stop - self.start) * 1e9)),
+        )
+
+        if self.path:
+            with open(self.path, "w", encoding=environ.ENCODING) as fp:
+                fp.write(self.collapsed_value())
+                fp.write("\n")
+
+            return "{}, collapsed stacks written to {}".format(
+                summary,
+                self.path
+            )
+
+        elif self.collapsed:
+            return "{}\n\n{}".format(summary, self.collapsed_value())
+
+        else:
+            return "{}\n\n{}".format(summary, self.top_value())
+
+    def __call__(
+        self,
+        interval_ms=1,
+        top=20,
+        collapsed=False,
+        path="",
+        all_threads=False,
+        **kwargs
+    ):
+        """Sample the stack while the with block runs
+
+        :param interval_ms: int|float, how many milliseconds between samples
+        :param top: int, how many functions and lines to print
+        :param collapsed: bool, True to print collapsed stacks instead of the
+            top functions and lines
+        :param path: str, write the collapsed stacks to this file instead of
+            printing them (eg, for flamegraph.pl or speedscope)
+        :param all_threads: bool, True to sample every thread and not just the
+            thread that started the with block
+        :returns: context manager
+        """
+        self.interval = interval_ms / 1000.0
+        self.top = top
+        self.collapsed = collapsed
+        self.path = path
+        self.all_threads = all_threads
+        kwargs.setdefault("show_path", False)
+        self.kwargs = kwargs
+        return self
+
+
 class L(Interface):
     """Logging context manager used in pout.l()
 
@@ -879,6 +2256,8 @@ class L(Interface):
     similar to:
     https://github.com/python/cpython/blob/d918bbda4bb201c35d1ded3dde686d8b00a91851/Lib/unittest/case.py#L297
     """
+    ASYNC_SUPPORTED = False
+
     @property
     def loggers(self):
         """Return all the loggers that should be activated"""
@@ -1080,6 +2459,8 @@ class T(Interface):
 
 
 class Tofile(Interface):
+    ASYNC_SUPPORTED = False
+
     def __enter__(self):
         self.orig_stream = self.kwargs["pout_module"].stream
         self.kwargs["pout_module"].stream = self.stream
@@ -1087,6 +2468,7 @@ class Tofile(Interface):
 
     def __exit__(self, *args, **kwargs):
         self.kwargs["pout_module"].stream = self.orig_stream
+        self.stream.close()
 
     def __call__(self, path="", **kwargs):
         """Instead of printing to a screen print to a file
@@ -1098,7 +2480,20 @@ class Tofile(Interface):
                 pout.b()
                 pout.h()
 
+            # keep at most 100MB of 10MB gzipped segments
+            with pout.tofile("/path/to/file.txt", max_bytes=10000000,
+                max_total=100000000):
+                pout.v("a string")
+
         :param path: str, a path to the file you want to write to
+        :keyword max_bytes: int, rotate the file once it has this many bytes
+        :keyword interval: int|float, rotate the file after this many seconds
+        :keyword compress: str, compress rotated segments with "gzip" (the
+            default) or "lzma", empty to not compress them
+        :keyword max_total: int, delete the oldest segments once all of them
+            are bigger than this many bytes
+        :keyword grace: int|float, compress a segment once nothing has
+            written to it for this many seconds
         """
         if not path:
             path = os.path.join(
@@ -1108,7 +2503,18 @@ class Tofile(Interface):
 
         self.path = path
         self.kwargs = kwargs
-        self.stream = FileStream(path)
+        if kwargs.get("max_bytes") or kwargs.get("interval"):
+            self.stream = RotatingFileStream(
+                path,
+                max_bytes=kwargs.get("max_bytes", 0),
+                interval=kwargs.get("interval", 0),
+                compress=kwargs.get("compress", "gzip"),
+                max_total=kwargs.get("max_total", 0),
+                grace=kwargs.get("grace", 1.0),
+            )
+
+        else:
+            self.stream = FileStream(path)
 
         return self
 
@@ -1158,6 +2564,8 @@ class Browser(Interface):
     https://docs.python.org/3/library/webbrowser.html
     https://docs.python.org/3/library/tempfile.html#tempfile.NamedTemporaryFile
     """
+    ASYNC_SUPPORTED = False
+
     def __call__(self, data, **kwargs):
         """
         :param data: the data to display in a browser window
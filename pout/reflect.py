@@ -491,6 +491,13 @@ class Reflect(object):
             #logger.exception(e)
             self.call = None
 
+        finally:
+            # the stack contains this frame, so it has to be cleared to
+            # break the reference cycle, otherwise every frame (and their
+            # locals) stay alive until the garbage collector runs
+            # https://docs.python.org/3/library/inspect.html#the-interpreter-stack
+            del frame, frames
+
         self.info = self._get_arg_info()
 
         return self
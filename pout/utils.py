@@ -1,8 +1,24 @@
 # -*- coding: utf-8 -*-
 import sys
+import os
+import io
 import logging
 import re
 import textwrap
+import threading
+import atexit
+import weakref
+import collections
+import math
+import time
+import gzip
+import lzma
+import shutil
+import json
+import mmap
+import struct
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 
 from .compat import String as BaseString, Bytes
 from . import environ
@@ -158,6 +174,32 @@ class Stream(object):
         """
         raise NotImplementedError()
 
+    def get_palette(self):
+        """Returns the palette that should be used to render output for this
+        stream, by default the stream doesn't support color
+
+        :returns: Palette
+        """
+        palette = getattr(self, "_palette", None)
+        if palette is None:
+            palette = Palette(False)
+            self._palette = palette
+
+        return palette
+
+    def get_stream_palette(self, stream):
+        """Returns a palette for an io stream, the palette is rebuilt if the
+        stream changes
+
+        :param stream: io.IOBase
+        :returns: Palette
+        """
+        if getattr(self, "_palette_stream", None) is not stream:
+            self._palette = Palette(environ.is_color_stream(stream))
+            self._palette_stream = stream
+
+        return self._palette
+
 
 class StderrStream(Stream):
     """A stream object that writes out to stderr"""
@@ -178,19 +220,1114 @@ class StderrStream(Stream):
     def writeline(self, s):
         self.logger.debug(String(s))
 
+    def get_palette(self):
+        stream = None
+        for handler in self.logger.handlers:
+            stream = getattr(handler, "stream", None)
+            if stream:
+                break
+
+        return self.get_stream_palette(stream)
+
+
+class FileStream(Stream):
+    """A stream object that writes to a file path passed into it
+
+    All the streams of the same path share one file descriptor (see .pool)
+    that is opened with O_APPEND and every line is written with one
+    os.write() call, so multiple processes writing to the same path won't
+    interleave lines. The descriptors are reopened in forked children
+    """
+    pool = {}
+    """Holds the open file descriptors and their reference counts, keyed by
+    the absolute path"""
+
+    pool_lock = threading.Lock()
+
+    @classmethod
+    def open_fd(cls, path):
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND
+        flags |= getattr(os, "O_CLOEXEC", 0)
+        return os.open(path, flags, 0o644)
+
+    @classmethod
+    def reopen_pool(cls):
+        """Called in a forked child, the child gets its own descriptors so
+        the parent closing its descriptors doesn't affect the child"""
+        cls.pool_lock = threading.Lock()
+        for path, entry in cls.pool.items():
+            try:
+                os.close(entry["fd"])
+
+            except OSError:
+                pass
+
+            entry["fd"] = cls.open_fd(path)
 
-class FileStream(StderrStream):
-    """A stream object that writes to a file path passed into it"""
     def __init__(self, path):
-        logger = logging.getLogger("file.{}".format(__name__.split(".")[0]))
-        if len(logger.handlers) == 0:
-            logger.setLevel(logging.DEBUG)
-            log_handler = logging.FileHandler(path)
-            log_handler.setFormatter(logging.Formatter('%(message)s'))
-            logger.addHandler(log_handler)
-            logger.propagate = False
+        self.path = os.path.abspath(path)
+        self.closed = False
+
+        with self.pool_lock:
+            entry = self.pool.get(self.path)
+            if entry is None:
+                fd = self.open_fd(self.path)
+                entry = {
+                    "fd": fd,
+                    "count": 0,
+                    "size": os.fstat(fd).st_size,
+                    "opened": time.time(),
+                }
+                self.pool[self.path] = entry
+
+            entry["count"] += 1
 
-        self.logger = logger
+    def writeline(self, s):
+        if self.closed:
+            raise ValueError("Writing to closed stream {}".format(self.path))
+
+        b = String(s).encode(
+            environ.ENCODING,
+            errors=environ.ENCODING_REPLACE_METHOD
+        )
+        self.write(b + b"\n")
+
+    def write(self, b):
+        """Write b to the pooled file descriptor
+
+        :param b: bytes
+        """
+        entry = self.pool[self.path]
+        view = memoryview(b)
+        while view:
+            view = view[os.write(entry["fd"], view):]
+
+        entry["size"] += len(b)
+
+    def close(self):
+        """Release this stream's reference to the pooled file descriptor, the
+        descriptor is closed when no streams of the path are left"""
+        with self.pool_lock:
+            if self.closed:
+                return
+
+            self.closed = True
+            entry = self.pool[self.path]
+            entry["count"] -= 1
+            if entry["count"] <= 0:
+                os.close(entry["fd"])
+                self.pool.pop(self.path)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=FileStream.reopen_pool)
+
+
+class RotatingFileStream(FileStream):
+    """A file stream that keeps the file from growing forever
+
+    Once the file gets bigger than max_bytes, or older than interval seconds,
+    it is renamed to a segment (eg, pout.txt.20240101-120000.1234) and a new
+    file is started. Segments are compressed, and the oldest segments are
+    deleted once all the segments are bigger than max_total bytes, in a
+    background thread so writing a line never waits on either
+
+    The size is counted by each process, so when multiple processes share the
+    file it can get up to max_bytes times the number of processes before one
+    of them rotates it. Before every write the descriptor's inode is compared
+    to the path's inode, so the other processes notice the file was rotated
+    and start writing to the new file. A segment is only compressed once
+    nothing has written to it for grace seconds
+    """
+    compressors = {
+        "gzip": (gzip.open, ".gz"),
+        "lzma": (lzma.open, ".xz"),
+    }
+    """The supported compressions, the name maps to (open, file extension)"""
+
+    executor = None
+    """The executor segments are compressed and pruned in, see
+    .get_executor()"""
+
+    @classmethod
+    def get_executor(cls):
+        if RotatingFileStream.executor is None:
+            RotatingFileStream.executor = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix="pout",
+            )
+
+        return RotatingFileStream.executor
+
+    @classmethod
+    def reset_executor(cls):
+        """Called in a forked child, the parent's worker thread doesn't exist
+        in the child so the child needs its own executor"""
+        RotatingFileStream.executor = None
+
+    def __init__(
+        self,
+        path,
+        max_bytes=0,
+        interval=0,
+        compress="gzip",
+        max_total=0,
+        grace=1.0,
+    ):
+        """
+        :param path: str, the file path
+        :param max_bytes: int, rotate the file once it has this many bytes
+        :param interval: int|float, rotate the file once it has been open
+            this many seconds
+        :param compress: str, one of the keys of .compressors, or empty to
+            not compress the segments
+        :param max_total: int, the oldest segments are deleted until all the
+            segments (plus the current file) are at most this many bytes
+        :param grace: int|float, a segment is compressed once it hasn't been
+            modified for this many seconds, this gives other processes that
+            were writing to the segment time to move to the new file
+        """
+        if compress and compress not in self.compressors:
+            raise ValueError(
+                "Unknown compression {}, use one of: {}".format(
+                    compress,
+                    ", ".join(self.compressors)
+                )
+            )
+
+        super().__init__(path)
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.compress = compress
+        self.max_total = max_total
+        self.grace = grace
+        self.segment_regex = re.compile(
+            r"^{}\.\d{{8}}-\d{{6}}\.\d+(?:\.\d+)?(?:\.gz|\.xz)?$".format(
+                re.escape(os.path.basename(self.path))
+            )
+        )
+
+    def is_rotated(self, fd):
+        """True if the path no longer points to the file fd has open
+
+        :param fd: int, the file descriptor
+        :returns: bool
+        """
+        try:
+            return os.stat(self.path).st_ino != os.fstat(fd).st_ino
+
+        except FileNotFoundError:
+            return True
+
+    def reopen(self, entry):
+        """Open the file at the path and replace entry's descriptor, the
+        caller must hold .pool_lock
+
+        :param entry: dict, the .pool entry of the path
+        """
+        fd = entry["fd"]
+        entry["fd"] = self.open_fd(self.path)
+        entry["size"] = os.fstat(entry["fd"]).st_size
+        entry["opened"] = time.time()
+        os.close(fd)
+
+    def write(self, b):
+        entry = self.pool[self.path]
+        if self.is_rotated(entry["fd"]):
+            # another process rotated the file
+            with self.pool_lock:
+                if self.is_rotated(entry["fd"]):
+                    self.reopen(entry)
+
+        super().write(b)
+
+        if (
+            (self.max_bytes and entry["size"] >= self.max_bytes)
+            or (
+                self.interval
+                and time.time() - entry["opened"] >= self.interval
+            )
+        ):
+            self.rotate()
+
+    def rotate(self):
+        """Move the current file to a segment and start a new file"""
+        segment = ""
+        with self.pool_lock:
+            entry = self.pool[self.path]
+            if not self.is_rotated(entry["fd"]):
+                segment = "{}.{}.{}".format(
+                    self.path,
+                    time.strftime("%Y%m%d-%H%M%S"),
+                    os.getpid(),
+                )
+                if os.path.exists(segment):
+                    segment += ".{}".format(time.monotonic_ns())
+
+                try:
+                    os.rename(self.path, segment)
+
+                except FileNotFoundError:
+                    # another process rotated the file first
+                    segment = ""
+
+            self.reopen(entry)
+
+        self.get_executor().submit(self.finish_segment, segment)
+
+    def get_segments(self):
+        """Returns the segments of the path that are done being written
+
+        Only the files that match the segment name are returned, segments are
+        compressed into a temporary file so they aren't returned until they
+        are finished
+
+        :returns: list[tuple[float, int, str]], the (mtime, size, path) of
+            each segment, oldest first
+        """
+        segments = []
+        dirpath = os.path.dirname(self.path)
+        for name in os.listdir(dirpath):
+            if self.segment_regex.match(name):
+                p = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(p)
+
+                except FileNotFoundError:
+                    continue
+
+                segments.append((st.st_mtime, st.st_size, p))
+
+        segments.sort()
+        return segments
+
+    def finish_segment(self, segment):
+        """Ran in the background, compress segment and then delete the oldest
+        segments until they fit in max_total
+
+        :param segment: str, the path of the segment that was just rotated,
+            can be empty
+        """
+        if segment and self.compress:
+            # wait for the other processes to stop writing to the segment
+            while True:
+                try:
+                    age = time.time() - os.stat(segment).st_mtime
+
+                except FileNotFoundError:
+                    segment = ""
+                    break
+
+                if age >= self.grace:
+                    break
+
+                time.sleep(self.grace - age)
+
+        if segment and self.compress:
+            open_compressed, ext = self.compressors[self.compress]
+            tmp_path = segment + ext + ".tmp"
+            with open(segment, "rb") as src:
+                with open_compressed(tmp_path, "wb") as dest:
+                    shutil.copyfileobj(src, dest)
+
+            os.rename(tmp_path, segment + ext)
+            os.remove(segment)
+
+        if self.max_total:
+            segments = self.get_segments()
+            try:
+                total = os.stat(self.path).st_size
+
+            except FileNotFoundError:
+                total = 0
+
+            total += sum(size for _, size, _ in segments)
+            while segments and total > self.max_total:
+                _, size, p = segments.pop(0)
+                if self.compress and not p.endswith(
+                    self.compressors[self.compress][1]
+                ):
+                    # the segment is waiting to be compressed
+                    continue
+
+                try:
+                    os.remove(p)
+
+                except FileNotFoundError:
+                    pass
+
+                total -= size
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=RotatingFileStream.reset_executor)
+
+
+class BufferedStream(Stream):
+    """A stream object that writes straight to stderr's file descriptor
+    through a buffer instead of going through the logging module
+
+    The buffer is flushed when it holds more than buffer_size bytes, after
+    every flush_lines lines, when .flush() is called, and when the interpreter
+    exits
+
+    If the target stream doesn't have a file descriptor (eg, sys.stderr was
+    replaced with a StringIO to capture output) then the buffer will be
+    written to the stream using its .write() method
+    """
+    instances = weakref.WeakSet()
+    """Holds the live buffered streams so they can be flushed at exit and
+    cleared in forked children without keeping them alive"""
+
+    @classmethod
+    def flush_all(cls):
+        """Called when the interpreter exits"""
+        for instance in list(cls.instances):
+            instance.flush()
+
+    @classmethod
+    def clear_all(cls):
+        """Called in a forked child, the child shouldn't write the parent's
+        buffered lines"""
+        for instance in list(cls.instances):
+            instance.lock = threading.RLock()
+            instance.buffer.clear()
+            instance.lines = 0
+
+    def __init__(self, stream=None, buffer_size=0, flush_lines=-1):
+        """
+        :param stream: io.IOBase, the stream to write to, if None then
+            sys.stderr will be used, it is looked up on every flush so
+            replacing sys.stderr will be honored
+        :param buffer_size: int, flush when the buffer has this many bytes,
+            defaults to environ.BUFFER_SIZE
+        :param flush_lines: int, flush after this many lines, 0 means only
+            flush on buffer size or exit, defaults to environ.FLUSH_LINES
+        """
+        self.stream = stream
+        self.buffer_size = buffer_size or environ.BUFFER_SIZE
+        self.flush_lines = (
+            environ.FLUSH_LINES if flush_lines < 0 else flush_lines
+        )
+
+        self.buffer = bytearray()
+        self.lines = 0
+        self.lock = threading.RLock()
+        self.instances.add(self)
+
+    def writeline(self, s):
+        b = String(s).encode(
+            environ.ENCODING,
+            errors=environ.ENCODING_REPLACE_METHOD
+        )
+
+        with self.lock:
+            self.buffer += b
+            self.buffer += b"\n"
+            self.lines += 1
+
+            if (
+                len(self.buffer) >= self.buffer_size
+                or (self.flush_lines and self.lines >= self.flush_lines)
+            ):
+                self.flush()
+
+    def get_palette(self):
+        return self.get_stream_palette(self.stream or sys.stderr)
+
+    def get_fileno(self, stream):
+        """Returns the file descriptor of stream
+
+        Only real io streams are trusted, wrappers (like the ones used to
+        capture output) can proxy .fileno() to the stream they replaced and
+        writing to that descriptor would bypass them
+
+        :param stream: io.IOBase
+        :returns: int|None, None if stream doesn't have a file descriptor
+        """
+        if isinstance(stream, io.IOBase):
+            try:
+                return stream.fileno()
+
+            except (OSError, ValueError):
+                pass
+
+    def flush(self):
+        """Write out everything in the buffer
+
+        Like logging.Handler.handleError, a stream that can't be written to
+        (eg, a closed stderr or a broken pipe) doesn't raise, the buffered
+        lines are dropped
+        """
+        with self.lock:
+            if not self.buffer:
+                return
+
+            b = bytes(self.buffer)
+            self.buffer.clear()
+            self.lines = 0
+
+            stream = self.stream or sys.stderr
+            try:
+                fd = self.get_fileno(stream)
+                if fd is None:
+                    stream.write(b.decode(environ.ENCODING))
+                    stream.flush()
+
+                else:
+                    # anything the stream has buffered needs to go out first
+                    # so the lines stay in order
+                    stream.flush()
+                    view = memoryview(b)
+                    while view:
+                        view = view[os.write(fd, view):]
+
+            except (OSError, ValueError):
+                pass
+
+
+atexit.register(BufferedStream.flush_all)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=BufferedStream.clear_all)
+
+
+class QueueStream(Stream):
+    """A stream object that hands lines off to a background writer thread
+
+    The calling thread only appends the line (or a callable that returns the
+    line, so rendering can also happen on the writer thread) to a bounded
+    queue, the writer thread writes everything in the queue to the wrapped
+    stream. This keeps a slow stderr (eg, a full pipe) from stalling the code
+    that called pout
+
+    When the queue is full the policy decides what happens:
+
+        * block: wait for the writer thread to make room
+        * drop-oldest: throw away the oldest queued line
+        * drop-newest: throw away the line being written
+
+    How many lines were dropped is written out when the interpreter exits
+    """
+    POLICIES = ("block", "drop-oldest", "drop-newest")
+
+    CLOSE_TIMEOUT = 5.0
+    """How many seconds .close() waits for the writer thread, anything still
+    queued after that is dropped so a stalled stream can't hang the
+    interpreter exiting"""
+
+    instances = weakref.WeakSet()
+    """Holds the live queue streams so they can be closed at exit and reset
+    in forked children without keeping them alive"""
+
+    @classmethod
+    def close_all(cls):
+        """Called when the interpreter exits"""
+        for instance in list(cls.instances):
+            instance.close()
+
+    @classmethod
+    def reset_all(cls):
+        """Called in a forked child, the writer thread doesn't exist in the
+        child"""
+        for instance in list(cls.instances):
+            instance.reset()
+
+    def __init__(self, stream=None, maxsize=-1, policy=""):
+        """
+        :param stream: Stream, the stream the writer thread writes to,
+            defaults to a BufferedStream
+        :param maxsize: int, how many lines can be queued, 0 means no limit,
+            defaults to environ.QUEUE_SIZE
+        :param policy: str, one of .POLICIES, defaults to environ.QUEUE_POLICY
+        """
+        self.stream = stream or BufferedStream()
+        self.maxsize = environ.QUEUE_SIZE if maxsize < 0 else maxsize
+        self.policy = (policy or environ.QUEUE_POLICY).lower()
+        if self.policy not in self.POLICIES:
+            raise ValueError(
+                "Unknown queue policy {}, use one of: {}".format(
+                    self.policy,
+                    ", ".join(self.POLICIES)
+                )
+            )
+
+        self.dropped = 0
+        self.reset()
+        self.instances.add(self)
+
+    def get_palette(self):
+        if get_palette := getattr(self.stream, "get_palette", None):
+            return get_palette()
+
+        return super().get_palette()
+
+    def reset(self):
+        self.records = collections.deque()
+        self.condition = threading.Condition()
+        self.writing = False
+        self.closed = False
+        self.thread = None
+
+    def writeline(self, s):
+        """Queue s to be written by the writer thread
+
+        :param s: str|Callable[[], str], the line, or a render job that will
+            be called on the writer thread and returns the line
+        """
+        if not self.enqueue(s):
+            # the writer thread is gone, or this is the writer thread (eg, a
+            # render job called pout), so just write it, this happens outside
+            # the lock so a slow stream can't block closing
+            self.stream.writeline(s() if callable(s) else s)
+
+    def enqueue(self, s):
+        """Add s to the queue for the writer thread
+
+        :param s: str|Callable[[], str]
+        :returns: bool, False if s has to be written by the caller
+        """
+        with self.condition:
+            if self.closed or threading.current_thread() is self.thread:
+                return False
+
+            if self.maxsize and len(self.records) >= self.maxsize:
+                if self.policy == "drop-newest":
+                    self.dropped += 1
+                    return True
+
+                elif self.policy == "drop-oldest":
+                    self.records.popleft()
+                    self.dropped += 1
+
+                else:
+                    while (
+                        len(self.records) >= self.maxsize
+                        and not self.closed
+                    ):
+                        self.condition.wait()
+
+                    if self.closed:
+                        # the stream was closed while waiting for room
+                        return False
+
+            if self.thread is None:
+                thread = threading.Thread(
+                    target=self.run,
+                    name="pout.QueueStream",
+                    daemon=True,
+                )
+
+                try:
+                    thread.start()
+
+                except RuntimeError:
+                    # threads can't be started while the interpreter is
+                    # shutting down
+                    return False
+
+                self.thread = thread
+
+            self.records.append(s)
+            self.condition.notify_all()
+            return True
+
+    def run(self):
+        """The writer thread, this writes everything queued to .stream"""
+        while True:
+            with self.condition:
+                while not self.records and not self.closed:
+                    self.condition.wait()
+
+                if not self.records:
+                    return
+
+                records = list(self.records)
+                self.records.clear()
+                self.writing = True
+                self.condition.notify_all()
+
+            try:
+                for s in records:
+                    try:
+                        self.stream.writeline(s() if callable(s) else s)
+
+                    except Exception as e:
+                        self.stream.writeline(
+                            "pout failed to write a line: {}".format(e)
+                        )
+
+                if flush := getattr(self.stream, "flush", None):
+                    flush()
+
+            finally:
+                with self.condition:
+                    self.writing = False
+                    self.condition.notify_all()
+
+    def flush(self):
+        """Block until everything that has been queued has been written"""
+        with self.condition:
+            while self.thread and (self.records or self.writing):
+                self.condition.wait()
+
+    def close(self, timeout=None):
+        """Write everything still queued, stop the writer thread, and report
+        how many lines were dropped
+
+        :param timeout: float, how many seconds to wait for the writer
+            thread, defaults to .CLOSE_TIMEOUT
+        """
+        with self.condition:
+            if self.closed:
+                return
+
+            self.closed = True
+            self.condition.notify_all()
+            thread = self.thread
+
+        stalled = False
+        if thread:
+            thread.join(self.CLOSE_TIMEOUT if timeout is None else timeout)
+            stalled = thread.is_alive()
+
+        if self.dropped:
+            self.write_report(
+                "pout dropped {} line{} because its queue was full ({})".format(
+                    self.dropped,
+                    "" if self.dropped == 1 else "s",
+                    self.policy,
+                ),
+                stalled=stalled,
+            )
+
+        if stalled:
+            with self.condition:
+                count = len(self.records)
+                self.records.clear()
+
+            self.dropped += count
+            self.write_report(
+                "pout dropped {} line{} because its stream stalled".format(
+                    count,
+                    "" if count == 1 else "s",
+                ),
+                stalled=True,
+            )
+
+        elif flush := getattr(self.stream, "flush", None):
+            flush()
+
+    def write_report(self, s, stalled=False):
+        """Write a line about the queue itself
+
+        :param s: str
+        :param stalled: bool, True if the writer thread is stuck writing to
+            .stream, then the line is written to sys.stderr instead
+        """
+        try:
+            if stalled:
+                sys.stderr.write(s + "\n")
+                sys.stderr.flush()
+
+            else:
+                self.stream.writeline(s)
+
+        except (OSError, ValueError):
+            pass
+
+
+# registered after BufferedStream.flush_all so it runs first at exit and the
+# lines the writer threads write out are flushed
+atexit.register(QueueStream.close_all)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=QueueStream.reset_all)
+
+
+class JsonStream(Stream):
+    """A stream object that writes every pout call as one JSON object per line
+    (JSON lines) so the output can be searched and aggregated with standard
+    tools
+
+    Interfaces pass the call information to .writerecord(), see
+    pout.interface.Interface.create_record()
+
+    By default the lines are written in batches by a QueueStream's writer
+    thread
+    """
+    def __init__(self, stream=None):
+        """
+        :param stream: Stream, where the JSON lines are written, defaults to
+            stderr through a QueueStream
+        """
+        self.stream = stream or QueueStream(BufferedStream(flush_lines=0))
+
+    def writeline(self, s):
+        self.writerecord({"text": s})
+
+    def writerecord(self, record):
+        """Write record as a JSON line
+
+        :param record: dict, the "text" key will have its color and
+            surrounding whitespace removed
+        """
+        if text := record.get("text"):
+            record["text"] = Color.strip(String(text)).strip()
+
+        self.stream.writeline(
+            json.dumps(record, default=String, ensure_ascii=False)
+        )
+
+    def flush(self):
+        if flush := getattr(self.stream, "flush", None):
+            flush()
+
+
+class RingStream(Stream):
+    """A stream object that writes lines into a fixed size circular buffer in
+    a memory mapped file, once the buffer is full the oldest lines are
+    overwritten
+
+    Writing a line only copies it into the mapped memory, so there are no
+    system calls per write, and the operating system keeps the file up to date
+    even if the process crashes. Use `pout ring dump <path>` to print the
+    lines in the file
+
+    The file starts with a header (see .HEADER) followed by the buffer, each
+    line in the buffer is a 4 byte length followed by the line. The header's
+    head and tail are the total bytes ever written and the position of the
+    oldest line, so the lines are always tail to head
+
+    The buffer can only be written to by one process, so forked children
+    write to their own file (the path with .<PID> added to it)
+    """
+    MAGIC = b"POUTRING"
+
+    HEADER = struct.Struct("<8sIQQQ")
+    """magic, version, capacity, head, tail"""
+
+    HEADER_SIZE = 64
+
+    LENGTH = struct.Struct("<I")
+
+    def __init__(self, path, size=0):
+        """
+        :param path: str, the file path
+        :param size: int, how many bytes the buffer can hold, defaults to
+            environ.RING_SIZE
+        """
+        self.size = size or environ.RING_SIZE
+        self.lock = threading.Lock()
+        self.open(path)
+
+        ref = weakref.ref(self)
+
+        def reopen():
+            if instance := ref():
+                instance.lock = threading.Lock()
+                instance.open("{}.{}".format(instance.path, os.getpid()))
+
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=reopen)
+
+    def open(self, path):
+        """Map path, a file that already has a buffer of the same size will
+        keep its lines
+
+        :param path: str
+        """
+        self.path = os.path.abspath(path)
+        file_size = self.HEADER_SIZE + self.size
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != file_size:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, file_size)
+
+            self.mm = mmap.mmap(fd, file_size)
+
+        finally:
+            os.close(fd)
+
+        magic, version, capacity, head, tail = self.HEADER.unpack_from(
+            self.mm,
+            0
+        )
+        if magic != self.MAGIC or capacity != self.size or tail > head:
+            head = tail = 0
+            self.HEADER.pack_into(self.mm, 0, self.MAGIC, 1, self.size, 0, 0)
+
+        self.head = head
+        self.tail = tail
+
+    @classmethod
+    def read(cls, path):
+        """Read the lines in a ring file, oldest to newest
+
+        :param path: str
+        :returns: generator[bytes]
+        """
+        with open(path, "rb") as fp:
+            buf = fp.read()
+
+        magic, version, capacity, head, tail = cls.HEADER.unpack_from(buf, 0)
+        if magic != cls.MAGIC:
+            raise ValueError("{} is not a pout ring file".format(path))
+
+        data = buf[cls.HEADER_SIZE:cls.HEADER_SIZE + capacity]
+
+        def read_bytes(position, count):
+            offset = position % capacity
+            b = data[offset:offset + count]
+            if len(b) < count:
+                b += data[:count - len(b)]
+            return b
+
+        position = tail
+        while position < head:
+            b = read_bytes(position, cls.LENGTH.size)
+            length = cls.LENGTH.unpack(b)[0]
+            position += cls.LENGTH.size
+            yield read_bytes(position, length)
+            position += length
+
+    def write_bytes(self, position, b):
+        """Copy b into the buffer at position, wrapping around the end
+
+        :param position: int, the absolute position, see .head
+        :param b: bytes
+        """
+        offset = position % self.size
+        start = self.HEADER_SIZE + offset
+        first = min(len(b), self.size - offset)
+        self.mm[start:start + first] = b[:first]
+        if first < len(b):
+            rest = len(b) - first
+            self.mm[self.HEADER_SIZE:self.HEADER_SIZE + rest] = b[first:]
+
+    def read_length(self, position):
+        offset = position % self.size
+        start = self.HEADER_SIZE + offset
+        b = self.mm[start:start + self.LENGTH.size]
+        if len(b) < self.LENGTH.size:
+            count = self.LENGTH.size - len(b)
+            b += self.mm[self.HEADER_SIZE:self.HEADER_SIZE + count]
+
+        return self.LENGTH.unpack(b)[0]
+
+    def writeline(self, s):
+        b = String(s).encode(
+            environ.ENCODING,
+            errors=environ.ENCODING_REPLACE_METHOD
+        )
+
+        # a line can't be bigger than the buffer
+        b = b[:self.size - self.LENGTH.size]
+        length = self.LENGTH.size + len(b)
+
+        with self.lock:
+            head = self.head
+            tail = self.tail
+
+            # make room by moving the tail past the oldest lines
+            while head + length - tail > self.size:
+                tail += self.LENGTH.size + self.read_length(tail)
+
+            if tail != self.tail:
+                # the tail is saved before the line is written so a crash
+                # mid write never leaves the tail pointing at a partial line
+                self.tail = tail
+                self.HEADER.pack_into(
+                    self.mm,
+                    0,
+                    self.MAGIC,
+                    1,
+                    self.size,
+                    self.head,
+                    tail,
+                )
+
+            self.write_bytes(head, self.LENGTH.pack(len(b)) + b)
+            self.head = head + length
+            self.HEADER.pack_into(
+                self.mm,
+                0,
+                self.MAGIC,
+                1,
+                self.size,
+                self.head,
+                tail,
+            )
+
+    def flush(self):
+        with self.lock:
+            self.mm.flush()
+
+
+class MultiStream(Stream):
+    """A stream object that writes every pout call to multiple streams (sinks)
+
+    Each call is only rendered once, with color if any of the sinks supports
+    color, and the color is stripped once for all the sinks that don't
+    support it, so adding sinks doesn't add rendering cost
+
+    :Example:
+        pout.stream = MultiStream(
+            BufferedStream(),
+            JsonStream(FileStream("pout.jsonl")),
+        )
+        pout.stream.add(JsonStream(RingStream("pout.ring")), level="INFO")
+    """
+    def __init__(self, *streams, **kwargs):
+        """
+        :param *streams: Stream, the sinks, see .add()
+        :param **kwargs: passed to .add() for each stream
+        """
+        self.sinks = []
+        for stream in streams:
+            self.add(stream, **kwargs)
+
+    def add(self, stream, level=logging.NOTSET, buffer_size=0, flush_lines=-1):
+        """Add a sink
+
+        :param stream: Stream|io.IOBase, if this is a file object (eg, an
+            open file or sys.stdout) then it will be wrapped in a
+            BufferedStream using buffer_size and flush_lines
+        :param level: int|str, the sink will only get calls from interfaces
+            with at least this level (see Interface.LEVEL)
+        :param buffer_size: int, see BufferedStream
+        :param flush_lines: int, see BufferedStream
+        :returns: Stream, the sink
+        """
+        if not hasattr(stream, "writeline"):
+            stream = BufferedStream(
+                stream,
+                buffer_size=buffer_size,
+                flush_lines=flush_lines,
+            )
+
+        if isinstance(level, str):
+            level = logging.getLevelName(level.upper())
+
+        self.sinks.append((stream, level))
+        return stream
+
+    def remove(self, stream):
+        """Remove a sink that was added with .add()"""
+        self.sinks = [sink for sink in self.sinks if sink[0] is not stream]
+
+    def get_palette(self):
+        for stream, _ in self.sinks:
+            if get_palette := getattr(stream, "get_palette", None):
+                if get_palette().enabled:
+                    return get_palette()
+
+        return super().get_palette()
+
+    def writeline(self, s):
+        self.writerecord({"text": s})
+
+    def writerecord(self, record):
+        """Write record to all the sinks that have a level that is at or below
+        the record's level
+
+        :param record: dict, see pout.interface.Interface.create_record(),
+            sinks that have a .writerecord() method get their own copy of
+            record, all the other sinks get record's "text"
+        """
+        level = record.get("level", logging.NOTSET)
+        if isinstance(level, str):
+            level = logging.getLevelName(level)
+
+        text = record.get("text", "")
+        plain_text = None
+        for stream, sink_level in self.sinks:
+            if level < sink_level:
+                continue
+
+            if writerecord := getattr(stream, "writerecord", None):
+                writerecord(dict(record))
+
+            else:
+                palette = getattr(stream, "get_palette", None)
+                if palette and palette().enabled:
+                    stream.writeline(text)
+
+                else:
+                    if plain_text is None:
+                        plain_text = Color.strip(String(text))
+
+                    stream.writeline(plain_text)
+
+    def flush(self):
+        for stream, _ in self.sinks:
+            if flush := getattr(stream, "flush", None):
+                flush()
+
+
+class Histogram(object):
+    """Keeps count, total, min, max, and approximate percentiles of a lot of
+    values in constant memory
+
+    The values are counted in logarithmic buckets that are PRECISION apart
+    (like an HDR histogram), so a percentile is within PRECISION of the real
+    value and the number of buckets only depends on the range of the values,
+    not how many values were added
+    """
+    PRECISION = 0.01
+    """The relative width of each bucket"""
+
+    def __init__(self):
+        self.buckets = collections.Counter()
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.base = math.log1p(self.PRECISION)
+
+    def add(self, value):
+        """Add value to the histogram
+
+        :param value: int|float, a positive value (eg, nanoseconds)
+        """
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+
+        if self.max is None or value > self.max:
+            self.max = value
+
+        index = int(math.log(value) / self.base) if value > 0 else -1
+        self.buckets[index] += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def percentile(self, percent):
+        """Returns the approximate value that percent of the values are at or
+        below
+
+        :param percent: float, between 0 and 100
+        :returns: float
+        """
+        if not self.count:
+            return 0
+
+        rank = max(1, math.ceil(self.count * percent / 100.0))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                break
+
+        if index < 0:
+            return 0
+
+        # the middle of the bucket, but never outside what was seen
+        value = math.exp((index + 0.5) * self.base)
+        return min(max(value, self.min), self.max)
 
 
 class OrderedItems(object):
@@ -207,6 +1344,14 @@ class OrderedItems(object):
 
 
 class Color(object):
+    ANSI_REGEX = re.compile(r"\x1b\[[0-9;]*m")
+    """Matches the escape codes .color() wraps text with"""
+
+    @classmethod
+    def strip(cls, text):
+        """Remove any color/formatting from text"""
+        return cls.ANSI_REGEX.sub("", text)
+
     @classmethod
     def color_header(cls, text):
         """The color/formatting for section headers for things like classes"""
@@ -247,26 +1392,14 @@ class Color(object):
 
     @classmethod
     def color(cls, text, fg="", bg="", **kwargs):
-        """Wrap text in fg and bg color
+        """Wrap text in fg and bg color using the current palette, see
+        Palette.color
 
         See:
             - https://github.com/Jaymon/pout/issues/94
             - https://en.wikipedia.org/wiki/ANSI_escape_code#Colors
             - https://unix.stackexchange.com/questions/105568/
 
-        Based off of this:
-            https://github.com/django/django/blob/main/django/utils/termcolors.py
-
-        The supported color names:
-            - BLACK
-            - RED
-            - GREEN
-            - YELLOW
-            - BLUE
-            - MAGENTA
-            - CYAN
-            - WHITE
-
         :param text: str, the text to wrap with fg and bg colors
         :param fg: str, the foreground color
         :param bg: str, the background color
@@ -274,65 +1407,143 @@ class Color(object):
         :keyword underline: bool, True to underline text
         :returns: str, text wrapped with terminal color if supported
         """
-        if text and environ.has_color_support():
-            color_names = (
-                "BLACK",
-                "RED",
-                "GREEN",
-                "YELLOW",
-                "BLUE",
-                "MAGENTA",
-                "CYAN",
-                "WHITE"
-            )
-            foreground = {color_names[x]: f"3{x}" for x in range(8)}
-            background = {color_names[x]: f"4{x}" for x in range(8)}
-
-            # bright versions
-            for x in range(8):
-                foreground[f"BRIGHT{color_names[x]}"] = f"9{x}"
-                background[f"BRIGHT{color_names[x]}"] = f"10{x}"
-
-            foreground["NONE"] = 0
-
-            aliases = [
-                ("LIGHTGRAY", "WHITE"),
-                ("BRIGHTGRAY", "BRIGHTBLACK"),
-                ("GRAY", "WHITE"),
-                ("PURPLE", "MAGENTA"),
-            ]
-            for k1, k2 in aliases:
-                foreground[k1] = foreground[k2]
-                background[k1] = background[k2]
-
-            options = {
-                "bold": "1",
-                "underscore": "4",
-                "underline": "4",
-                "blink": "5",
-                "reverse": "7",
-                "conceal": "8",
-            }
+        return Palette.get_current().color(text, fg, bg, **kwargs)
+
+
+class Palette(object):
+    """Wraps text in terminal colors using escape codes that are only
+    computed once
+
+    Each stream has its own palette (see Stream.get_palette) that decides if
+    that stream supports color, and the interfaces make the stream's palette
+    the current palette while they render, so Color uses the right palette
+
+    Based off of this:
+        https://github.com/django/django/blob/main/django/utils/termcolors.py
+
+    The supported color names:
+        - BLACK
+        - RED
+        - GREEN
+        - YELLOW
+        - BLUE
+        - MAGENTA
+        - CYAN
+        - WHITE
+
+    And their BRIGHT versions (eg, BRIGHTRED)
+    """
+    COLOR_NAMES = (
+        "BLACK",
+        "RED",
+        "GREEN",
+        "YELLOW",
+        "BLUE",
+        "MAGENTA",
+        "CYAN",
+        "WHITE"
+    )
+
+    FOREGROUND = {
+        **{name: f"3{x}" for x, name in enumerate(COLOR_NAMES)},
+        **{f"BRIGHT{name}": f"9{x}" for x, name in enumerate(COLOR_NAMES)},
+    }
+
+    BACKGROUND = {
+        **{name: f"4{x}" for x, name in enumerate(COLOR_NAMES)},
+        **{f"BRIGHT{name}": f"10{x}" for x, name in enumerate(COLOR_NAMES)},
+    }
+
+    for k1, k2 in [
+        ("LIGHTGRAY", "WHITE"),
+        ("BRIGHTGRAY", "BRIGHTBLACK"),
+        ("GRAY", "WHITE"),
+        ("PURPLE", "MAGENTA"),
+    ]:
+        FOREGROUND[k1] = FOREGROUND[k2]
+        BACKGROUND[k1] = BACKGROUND[k2]
+
+    del k1, k2
+
+    OPTIONS = {
+        "bold": "1",
+        "underscore": "4",
+        "underline": "4",
+        "blink": "5",
+        "reverse": "7",
+        "conceal": "8",
+    }
+
+    RESET = "\033[0m"
+
+    current = contextvars.ContextVar("pout_palette", default=None)
+    """The palette Color will use, see .get_current()"""
+
+    default = None
+    """The palette used when there isn't a current palette"""
+
+    @classmethod
+    def get_current(cls):
+        """Returns the current palette, or the default palette if there isn't
+        a current palette
 
+        :returns: Palette
+        """
+        if palette := cls.current.get():
+            return palette
+
+        if cls.default is None:
+            cls.default = cls(environ.is_color_stream(sys.stderr))
+
+        return cls.default
+
+    def __init__(self, enabled=True):
+        """
+        :param enabled: bool, True if the stream this palette is for
+            supports color, color can still be turned off everywhere with
+            environ.SHOW_COLOR
+        """
+        self.enabled = enabled
+        self.codes = {}
+
+    def get_code(self, fg="", bg="", **kwargs):
+        """Returns the escape code that starts the colors
+
+        :returns: str, empty if no colors were passed in
+        """
+        key = (fg, bg, *(k for k, v in kwargs.items() if v))
+        code = self.codes.get(key)
+        if code is None:
             codes = []
             if fg:
-                codes.append(foreground[fg.upper()])
+                codes.append(self.FOREGROUND[fg.upper()])
 
             if bg:
-                codes.append(background[bg.upper()])
+                codes.append(self.BACKGROUND[bg.upper()])
 
             for k, v in kwargs.items():
                 if v:
-                    k = k.lower()
-                    if options.get(k, False):
-                        codes.append(options[k])
+                    if option := self.OPTIONS.get(k.lower(), ""):
+                        codes.append(option)
+
+            code = "\033[{}m".format(";".join(codes)) if codes else ""
+            self.codes[key] = code
 
-            color = reset = ""
-            if codes:
-                color = "\033[{}m".format(";".join(codes))
-                reset = "\033[{}m".format(foreground["NONE"])
+        return code
 
-            text = f"{color}{text}{reset}"
+    def color(self, text, fg="", bg="", **kwargs):
+        """Wrap text in fg and bg color
+
+        :param text: str, the text to wrap with fg and bg colors
+        :param fg: str, the foreground color
+        :param bg: str, the background color
+        :keyword bold: bool, True to make text bold
+        :keyword underline: bool, True to underline text
+        :returns: str, text wrapped with terminal color if supported
+        """
+        if text and self.enabled and environ.SHOW_COLOR:
+            if code := self.get_code(fg, bg, **kwargs):
+                text = f"{code}{text}{self.RESET}"
 
         return text
 
@@ -21,6 +21,11 @@ import datetime
 import uuid
 import ast
 import enum
+import math
+import dataclasses
+import weakref
+import decimal
+import fractions
 
 from .compat import *
 from . import environ
@@ -139,8 +144,16 @@ class Value(object):
 
     OBJECT_STRING_LIMIT = environ.OBJECT_STRING_LIMIT
 
+    STRING_LIMIT = environ.STRING_LIMIT
+
+    BYTES_LIMIT = environ.BYTES_LIMIT
+
+    INT_LIMIT = environ.INT_LIMIT
+
     ITERATE_LIMIT = environ.ITERATE_LIMIT
 
+    TABLE_SAMPLE = environ.TABLE_SAMPLE
+
     INDENT_STRING = environ.INDENT_STRING
 
     OBJECT_DEPTH = environ.OBJECT_DEPTH
@@ -314,6 +327,11 @@ class Value(object):
         if isinstance(val, types.ModuleType):
             full_name = self._get_modpath(val)
 
+        elif isinstance(val, Snapshot):
+            full_name = val.snapshot_class.__qualname__
+            if modpath:
+                full_name = f"{val.snapshot_class.__module__}:{full_name}"
+
         else:
             module_name = ""
             class_name = None
@@ -417,6 +435,9 @@ class Value(object):
         :param v: Any, the python object we want the id value of
         :returns: str, v's id in hex format
         """
+        if isinstance(v, Snapshot):
+            return "0x{:02x}".format(v.snapshot_id)
+
         return "0x{:02x}".format(id(v))
 
     def _get_info(self, **kwargs):
@@ -628,6 +649,76 @@ class Value(object):
 
         return ret
 
+    @classmethod
+    def get_object_string(cls, val, limit):
+        """Returns the __str__ of val truncated to limit characters
+
+        :param val: Any
+        :param limit: int, the most characters of the string that are kept
+        :returns: tuple[str, int], the (possibly truncated) string and the
+            length of the full string
+        """
+        try:
+            s_str = String(val)
+
+        except Exception as e:
+            s_str = f"__str__ failed with: {e}"
+            strlen = len(s_str)
+
+        else:
+            strlen = len(s_str)
+            if strlen > limit:
+                s_str = s_str.truncate(limit)
+                s_str += "... Truncated {}/{} chars ...".format(
+                    strlen - limit,
+                    strlen
+                )
+
+        return s_str, strlen
+
+    def classes_value(self, val_class):
+        """Returns the class hierarchy of val_class, one class per line, used
+        in .object_value()
+
+        :param val_class: type
+        :returns: str
+        """
+        s_body = ""
+        pclses = inspect.getmro(val_class)
+        if pclses:
+            s_body += "\n"
+            for pcls in pclses:
+                psrc_file = self._get_src_file(pcls, default="")
+                if psrc_file:
+                    psrc_file = Path(psrc_file)
+                pname = self._get_name(pcls)
+                if psrc_file:
+                    pname = "{} ({})".format(pname, psrc_file)
+
+                if pname:
+                    pname = Color.color_meta(pname)
+
+                s_body += "{}".format(pname)
+                s_body += "\n"
+
+        return s_body
+
+    def object_string_value(self, s_str, strlen):
+        """Returns the __str__ section used in .object_value()
+
+        :param s_str: str, see .get_object_string()
+        :param strlen: int, the length of the full string
+        :returns: str
+        """
+        if s_str:
+            s_str = Color.color_string(s_str)
+
+        header = Color.color_header(f"__str__ ({strlen})")
+        s_body = f"\n{header}:\n"
+        s_body += self._add_indent(s_str, 1)
+        s_body += "\n"
+        return s_body
+
     def object_value(self):
         """Return information about the object itself
 
@@ -651,50 +742,12 @@ class Value(object):
         )
 
         if val_class := info_dict["val_class"]:
-            src_file = self._get_src_file(val_class, default="")
-            pclses = inspect.getmro(val_class)
-            if pclses:
-                s_body += "\n"
-                for pcls in pclses:
-                    psrc_file = self._get_src_file(pcls, default="")
-                    if psrc_file:
-                        psrc_file = Path(psrc_file)
-                    pname = self._get_name(pcls)
-                    if psrc_file:
-                        pname = "{} ({})".format(pname, psrc_file)
-
-                    if pname:
-                        pname = Color.color_meta(pname)
-
-                    s_body += "{}".format(pname)
-                    s_body += "\n"
+            s_body += self.classes_value(val_class)
 
         if SHOW_OBJECT_STRING and hasattr(val, "__str__"):
-            try:
-                s_str = String(val)
-
-            except Exception as e:
-                s_str = f"__str__ failed with: {e}"
-                strlen = len(s_str)
-
-            else:
-                strlen = len(s_str)
-                OBJECT_STRING_LIMIT = self.OBJECT_STRING_LIMIT
-
-                if strlen > OBJECT_STRING_LIMIT:
-                    s_str = s_str.truncate(OBJECT_STRING_LIMIT)
-                    s_str += "... Truncated {}/{} chars ...".format(
-                        strlen - OBJECT_STRING_LIMIT,
-                        strlen
-                    )
-
-            if s_str:
-                s_str = Color.color_string(s_str)
-
-            header = Color.color_header(f"__str__ ({strlen})")
-            s_body += f"\n{header}:\n"
-            s_body += self._add_indent(s_str, 1)
-            s_body += "\n"
+            s_body += self.object_string_value(
+                *self.get_object_string(val, self.OBJECT_STRING_LIMIT)
+            )
 
         def get_attr_str(k, v, indent_depth):
             s_attr = "{} = {}".format(Color.color_attr(k), v.string_value())
@@ -988,6 +1041,138 @@ class InstanceValue(Value):
         return self.object_value()
 
 
+class FieldsValue(InstanceValue):
+    """Handles instances whose attributes are declared on the class, things
+    like dataclasses, attrs classes, and classes that use __slots__
+
+    This is defined right after InstanceValue so every other value class is
+    checked first (see Values), things like a dataclass exception are still
+    handled by their more specific value class
+
+    Only the declared fields (plus anything in the instance's __dict__) are
+    read, so this is much faster than the `inspect.getmembers` fallback
+    (which evaluates every attribute and property on the class hierarchy) and
+    it doesn't trigger any property side effects. The output is otherwise the
+    same as InstanceValue
+
+    https://docs.python.org/3/library/dataclasses.html#dataclasses.fields
+    https://docs.python.org/3/reference/datamodel.html#slots
+    https://www.attrs.org/en/stable/how-does-it-work.html
+    """
+    fields_cache = weakref.WeakKeyDictionary()
+    """Holds the field names of each class that has been checked, if a class
+    isn't a fields class then its field names will be None"""
+
+    @classmethod
+    def is_valid(cls, val):
+        return (
+            not isinstance(val, type)
+            and cls.get_fields(type(val)) is not None
+        )
+
+    @classmethod
+    def get_fields(cls, val_class):
+        """Returns the declared field names of val_class
+
+        :param val_class: type
+        :returns: tuple[str]|None, None if val_class doesn't declare its
+            fields
+        """
+        try:
+            return cls.fields_cache[val_class]
+
+        except KeyError:
+            fields = cls.find_fields(val_class)
+            cls.fields_cache[val_class] = fields
+            return fields
+
+        except TypeError:
+            # val_class can't be weak referenced
+            return cls.find_fields(val_class)
+
+    @classmethod
+    def find_fields(cls, val_class):
+        """Internal method. Finds the declared field names of val_class, you
+        should use .get_fields since that caches the found fields
+
+        :param val_class: type
+        :returns: tuple[str]|None
+        """
+        if dataclasses.is_dataclass(val_class):
+            return tuple(f.name for f in dataclasses.fields(val_class))
+
+        if attrs := getattr(val_class, "__attrs_attrs__", None):
+            return tuple(a.name for a in attrs)
+
+        module_name = (getattr(val_class, "__module__", "") or "").split(".")[0]
+        if module_name in sys.stdlib_module_names:
+            # standard library classes (eg, fractions.Fraction) use slots as
+            # an implementation detail, so they keep their normal output
+            return None
+
+        fields = []
+        for pcls in reversed(inspect.getmro(val_class)):
+            if pcls is object:
+                continue
+
+            slots = vars(pcls).get("__slots__", None)
+            if slots is None:
+                # a class in the hierarchy doesn't use slots so the instance
+                # will have a __dict__
+                return None
+
+            if isinstance(slots, str):
+                slots = [slots]
+
+            for name in slots:
+                if name == "__dict__":
+                    return None
+
+                elif name != "__weakref__":
+                    if name.startswith("__") and not name.endswith("__"):
+                        # private names are mangled
+                        name = "_{}{}".format(pcls.__name__.lstrip("_"), name)
+
+                    if name not in fields:
+                        fields.append(name)
+
+        return tuple(fields) if fields else None
+
+    def get_names(self):
+        """Returns the declared fields of .val plus any instance attributes
+        that were set outside of the declared fields (eg, a dataclass that
+        sets an attribute in __post_init__)
+
+        :returns: list[str]
+        """
+        names = list(self.get_fields(type(self.val)))
+        try:
+            names.extend(k for k in vars(self.val) if k not in names)
+
+        except TypeError:
+            # slots classes don't have a __dict__
+            pass
+
+        return names
+
+    def count_value(self):
+        return len(self.get_names())
+
+    def getmembers(self, **kwargs):
+        """Yields the fields of .val that have been set, this never uses
+        `inspect.getmembers` so properties aren't evaluated"""
+        for name in self.get_names():
+            try:
+                v = getattr(self.val, name)
+
+            except AttributeError:
+                # unset slots raise AttributeError
+                pass
+
+            else:
+                yield name, self.get_instance(v)
+
+
 class DescriptorValue(Value):
     """Handle user defined properties (things like @property)
 
@@ -1146,6 +1331,10 @@ class SQLiteRowValue(DictValue):
 
 
 class ListValue(DictValue):
+    SHOW_TABLE = False
+    """True to print a list of homogeneous records (dicts, namedtuples,
+    dataclasses, sqlite3.Row) as a table, see .table_value"""
+
     @classmethod
     def get_types(cls):
         return (list,)
@@ -1170,6 +1359,271 @@ class ListValue(DictValue):
         for v in enumerate(self.val):
             yield v
 
+    def val_value(self):
+        if self.SHOW_TABLE:
+            if columns := self._get_table_columns():
+                return self.table_value(
+                    columns,
+                    (self._get_table_row(row, columns) for row in self.val)
+                )
+
+        return super().val_value()
+
+    def _get_record_columns(self, row):
+        """Returns the keys of row if row is a record
+
+        :param row: Any
+        :returns: tuple[str]|None, None if row isn't a record
+        """
+        if isinstance(row, sqlite3.Row):
+            return tuple(row.keys())
+
+        elif isinstance(row, dict):
+            return tuple(row.keys())
+
+        elif NamedTupleValue.is_valid(row):
+            return row._fields
+
+        elif dataclasses.is_dataclass(row) and not isinstance(row, type):
+            return FieldsValue.get_fields(type(row))
+
+    def _get_table_columns(self):
+        """Returns the columns of .val if all the rows of .val are the same
+        type of record with the same keys
+
+        Only the first TABLE_SAMPLE rows are checked
+
+        :returns: tuple[str]|None, None if .val can't be printed as a table
+        """
+        if not isinstance(self.val, (list, tuple)) or not self.val:
+            return None
+
+        first = self.val[0]
+        columns = self._get_record_columns(first)
+        if not columns:
+            return None
+
+        sample = self.val[:self.TABLE_SAMPLE] if self.TABLE_SAMPLE > 0 else self.val
+        for row in sample:
+            if type(row) is not type(first):
+                return None
+
+            if isinstance(row, dict):
+                if row.keys() != first.keys():
+                    return None
+
+            elif self._get_record_columns(row) != columns:
+                return None
+
+        return columns
+
+    def _get_table_row(self, row, columns):
+        """Returns the values of row in column order
+
+        :param row: Any, a record, see ._get_record_columns
+        :param columns: Sequence[str]
+        :returns: Sequence
+        """
+        if isinstance(row, dict):
+            return [row.get(c) for c in columns]
+
+        elif dataclasses.is_dataclass(row):
+            return [getattr(row, c, None) for c in columns]
+
+        else:
+            return row
+
+    def _get_table_cell(self, v):
+        """Format one value of a table row, see .table_value
+
+        :param v: Any
+        :returns: str, the value on one line
+        """
+        if isinstance(v, str):
+            s = v if v.isprintable() else repr(v)
+
+        elif v is None or isinstance(v, (bool, float)):
+            s = str(v)
+
+        else:
+            s = repr(v)
+
+        return s
+
+    def table_value(self, columns, rows, rjust=()):
+        """Render rows as a table with one aligned line per row, this is much
+        denser than printing each row as its own nested value
+
+        The column widths and alignments are found from the first TABLE_SAMPLE
+        rows (in the same pass that formats those rows), after that each row
+        is formatted and written using the fixed widths, values wider than
+        their column are truncated
+
+        :param columns: Sequence[str], the column names
+        :param rows: Iterable[Sequence], each row's values in column order,
+            this will only be iterated up to ITERATE_LIMIT rows
+        :param rjust: Collection[str], the columns that should be right
+            aligned, numeric columns are always right aligned
+        :returns: str
+        """
+        ITERATE_LIMIT = self.ITERATE_LIMIT
+        TABLE_SAMPLE = self.TABLE_SAMPLE
+        widths = [len(String(c)) for c in columns]
+        numeric = [True] * len(widths)
+        sample = []
+        truncated = False
+        count = 0
+        rows = iter(rows)
+
+        for row in rows:
+            count += 1
+            if ITERATE_LIMIT > 0 and count > ITERATE_LIMIT:
+                truncated = True
+                break
+
+            cells = []
+            for i, v in zip(range(len(widths)), row):
+                cell = self._get_table_cell(v)
+                widths[i] = max(widths[i], len(cell))
+                if v is not None:
+                    numeric[i] = numeric[i] and (
+                        isinstance(v, (int, float))
+                        and not isinstance(v, bool)
+                    )
+
+                cells.append(cell)
+
+            sample.append(cells)
+            if TABLE_SAMPLE > 0 and len(sample) >= TABLE_SAMPLE:
+                break
+
+        right = [n or String(c) in rjust for n, c in zip(numeric, columns)]
+
+        def get_line(cells):
+            line = []
+            for i, cell in enumerate(cells):
+                width = widths[i]
+                if len(cell) > width:
+                    cell = cell[:width - 3] + "..." if width > 3 else cell[:width]
+
+                line.append(cell.rjust(width) if right[i] else cell.ljust(width))
+
+            return " | ".join(line).rstrip()
+
+        lines = [
+            Color.color_key(get_line([String(c) for c in columns])),
+            Color.color_meta("-+-".join("-" * w for w in widths)),
+        ]
+        lines.extend(get_line(cells) for cells in sample)
+
+        if not truncated:
+            for row in rows:
+                count += 1
+                if ITERATE_LIMIT > 0 and count > ITERATE_LIMIT:
+                    truncated = True
+                    break
+
+                lines.append(get_line([
+                    self._get_table_cell(v)
+                    for i, v in zip(range(len(widths)), row)
+                ]))
+
+        if truncated:
+            try:
+                total_rows = len(self.val)
+
+            except Exception:
+                lines.append("...")
+
+            else:
+                lines.append(
+                    "... Truncated {}/{} rows ...".format(
+                        total_rows - ITERATE_LIMIT,
+                        total_rows
+                    )
+                )
+
+        return "\n".join(lines)
+
+
+class SQLiteRowsValue(ListValue):
+    """Prints a list of sqlite3.Row instances (eg, the result of
+    `cursor.fetchall()`) as a table instead of as a list of dicts"""
+    SHOW_TABLE = True
+
+    @classmethod
+    def is_valid(cls, val):
+        return (
+            isinstance(val, list)
+            and len(val) > 0
+            and isinstance(val[0], sqlite3.Row)
+        )
+
+
+class SQLiteCursorValue(ListValue):
+    """Prints the remaining rows of a sqlite3.Cursor as a table
+
+    The rows are pulled from the cursor with `.fetchmany` so only
+    ITERATE_LIMIT rows are ever fetched, this consumes the cursor just like
+    GeneratorValue consumes a generator
+
+    https://docs.python.org/3/library/sqlite3.html#sqlite3.Cursor
+    """
+    @classmethod
+    def get_types(cls):
+        return (sqlite3.Cursor,)
+
+    def count_value(self):
+        """get how many rows were fetched from the cursor, this only works if
+        this is called after .val_value"""
+        try:
+            return self.count
+
+        except AttributeError:
+            return None
+
+    def has_body(self):
+        # a cursor that hasn't executed a query doesn't have any columns
+        return self.val.description is not None
+
+    def start_val_value(self):
+        return self.start_object_value()
+
+    def stop_val_value(self):
+        return self.stop_object_value()
+
+    def _get_instance_type(self):
+        return "cursor"
+
+    def rows(self):
+        """Yields the rows of the cursor, each row's values will be in column
+        order no matter what the cursor's row_factory is
+
+        :returns: Generator[Sequence]
+        """
+        self.count = 0
+        columns = [d[0] for d in self.val.description]
+        ITERATE_LIMIT = self.ITERATE_LIMIT
+        # we fetch one more than the limit so the table knows it was truncated
+        size = ITERATE_LIMIT + 1 if ITERATE_LIMIT > 0 else self.val.arraysize
+
+        while rows := self.val.fetchmany(max(size, 1)):
+            for row in rows:
+                if isinstance(row, dict):
+                    yield [row.get(c) for c in columns]
+
+                else:
+                    yield row
+
+                self.count += 1
+
+            if ITERATE_LIMIT > 0:
+                break
+
+    def val_value(self):
+        columns = [d[0] for d in self.val.description]
+        return self.table_value(columns, self.rows())
+
 
 class ArrayValue(ListValue):
     """Handles array.array instances"""
@@ -1178,9 +1632,13 @@ class ArrayValue(ListValue):
         return (array.array,)
 
     def classpath_value(self):
+        val_class = self.val.__class__
+        if isinstance(self.val, Snapshot):
+            val_class = self.val.snapshot_class
+
         return "{}.{} ({}{}{})".format(
-            self.val.__class__.__module__,
-            self.val.__class__.__name__,
+            val_class.__module__,
+            val_class.__name__,
             self.KEY_QUOTE_CHAR,
             self.val.typecode,
             self.KEY_QUOTE_CHAR
@@ -1321,6 +1779,10 @@ class NoneValue(PrimitiveValue):
 
 
 class IntValue(PrimitiveValue):
+    HEX_DIGITS = 8
+    """How many hex digits of the head and tail of a big integer are shown in
+    the integer's summary"""
+
     @classmethod
     def get_types(cls):
         return int
@@ -1328,6 +1790,71 @@ class IntValue(PrimitiveValue):
     def val_color(self, val):
         return Color.color_number(val)
 
+    def is_big(self):
+        """Return True if .val is an integer with more decimal digits than
+        INT_LIMIT
+
+        The digits are estimated from the bit length so the integer never has
+        to be converted to a decimal string
+
+        :returns: bool
+        """
+        if isinstance(self.val, int) and self.INT_LIMIT > 0:
+            digits = int(self.val.bit_length() * math.log10(2)) + 1
+            return digits > self.INT_LIMIT
+
+        return False
+
+    def summary_int_value(self):
+        """Summarize a big integer without converting it to a decimal string,
+        this is linear in the size of the integer while a decimal conversion is
+        quadratic
+
+        :returns: str, something like:
+            -0x1a2b3c4d...5e6f7a8b (4096 bits, 1234 digits, ~-1.2346e+1233)
+        """
+        val = self.val
+        sign = "-" if val < 0 else ""
+        val = abs(val)
+
+        bits = val.bit_length()
+        hex_digits = (bits + 3) // 4
+        width = self.HEX_DIGITS
+
+        if hex_digits > width * 2:
+            head = val >> ((hex_digits - width) * 4)
+            tail = val & ((1 << (width * 4)) - 1)
+            hex_value = f"0x{head:x}...{tail:0{width}x}"
+
+        else:
+            hex_value = f"0x{val:x}"
+
+        magnitude = math.log10(val)
+        exponent = int(magnitude)
+        mantissa = 10 ** (magnitude - exponent)
+
+        return "{}{} ({} bits, {} digits, ~{}{:.4f}e+{})".format(
+            sign,
+            hex_value,
+            bits,
+            exponent + 1,
+            sign,
+            mantissa,
+            exponent,
+        )
+
+    def val_value(self):
+        if self.is_big():
+            return self.val_color(self.summary_int_value())
+
+        try:
+            return super().val_value()
+
+        except ValueError:
+            # python 3.11+ raises a ValueError when an integer has more
+            # digits than sys.get_int_max_str_digits()
+            return self.val_color(self.summary_int_value())
+
 
 class BoolValue(IntValue):
     @classmethod
@@ -1364,8 +1891,24 @@ class StringValue(BuiltinValue):
         return True if self.val else False
 
     def val_value(self):
+        """Returns the string, if the string is longer than STRING_LIMIT then
+        only the head and tail of the string are returned, the omitted middle
+        of the string is never copied"""
         try:
-            s = String(self.val)
+            val = self.val
+            limit = self.STRING_LIMIT
+            total = len(val)
+            if limit > 0 and total > limit:
+                head = limit // 2
+                tail = limit - head
+                s = "{}... {} chars omitted ...{}".format(
+                    String(val[:head]),
+                    total - limit,
+                    String(val[-tail:]),
+                )
+
+            else:
+                s = String(val)
 
         except (TypeError, UnicodeError) as e:
             s = "<UNICODE ERROR>"
@@ -1416,18 +1959,149 @@ class StringLikeValue(StringValue):
 
 
 class BytesValue(StringValue):
+    """Handles bytes, bytearray, and memoryview instances
+
+    If the value is longer than BYTES_LIMIT then only the head and the tail
+    of the value will be printed, the value is sliced through a memoryview so
+    the omitted middle is never copied
+    """
+    SHOW_HEXDUMP = False
+    """True to print the value like `hexdump -C` instead of like a bytes
+    literal"""
+
+    HEXDUMP_WIDTH = 16
+    """How many bytes are on each hexdump line"""
+
     @classmethod
     def get_types(cls):
         return (bytes, bytearray, memoryview)
 
     def start_val_value(self):
+        if self.SHOW_HEXDUMP:
+            return self.start_object_value()
+
         return Color.color_string("b\"")
 
+    def stop_val_value(self):
+        if self.SHOW_HEXDUMP:
+            return self.stop_object_value()
+
+        return super().stop_val_value()
+
+    def _get_view(self):
+        """Returns .val as a flat memoryview of unsigned bytes
+
+        :returns: memoryview
+        """
+        view = memoryview(self.val)
+        if view.ndim != 1 or view.format != "B":
+            try:
+                view = view.cast("B")
+
+            except TypeError:
+                # non-contiguous views can't be cast so we have no choice
+                # but to copy them
+                view = memoryview(bytes(view))
+
+        return view
+
+    def _get_slices(self, view, align=1):
+        """Split view into its head and tail slices according to BYTES_LIMIT
+
+        :param view: memoryview, see ._get_view
+        :param align: int, the head and the start of the tail will be aligned
+            to a multiple of this value
+        :returns: list[tuple[int, memoryview]], a list of (offset, slice)
+            tuples, if there is more than one slice then the bytes between
+            them were omitted
+        """
+        if isinstance(self.val, SnapshotBytes):
+            total = self.val.snapshot_nbytes
+
+        else:
+            total = len(view)
+
+        limit = self.BYTES_LIMIT
+        slices = [(0, total)]
+        if limit > 0 and total > limit:
+            head = max((limit // 2) - ((limit // 2) % align), align)
+            tail = total - (limit - head)
+            tail -= tail % align
+            if tail > head:
+                slices = [(0, head), (tail, total)]
+
+        if isinstance(self.val, SnapshotBytes):
+            return self.val.get_slices(slices)
+
+        return [(start, view[start:stop]) for start, stop in slices]
+
+    def _get_omitted_value(self, count):
+        return f"... {count} bytes omitted ..."
+
+    def _get_bytes_value(self, view):
+        """Return view formatted like a bytes literal without the b'' wrapper
+
+        :param view: memoryview
+        :returns: str
+        """
+        s = repr(bytes(view))
+        if s.startswith("b'") or s.startswith("b\""):
+            s = s[2:-1] # strip preceding b' and trailing '
+
+        return s
+
+    def _get_hexdump_value(self, offset, view):
+        """Return view formatted like `hexdump -C` output
+
+        :param offset: int, where view starts in the full value
+        :param view: memoryview
+        :returns: list[str], the hexdump lines
+        """
+        width = self.HEXDUMP_WIDTH
+        half = width // 2
+        hex_width = (half * 3) - 1
+        lines = []
+        for i in range(0, len(view), width):
+            chunk = bytes(view[i:i + width])
+            chars = "".join(
+                chr(b) if 32 <= b < 127 else "." for b in chunk
+            )
+            lines.append("{:08x}  {:<{w}}  {:<{w}}  |{}|".format(
+                offset + i,
+                chunk[:half].hex(" "),
+                chunk[half:].hex(" "),
+                chars,
+                w=hex_width,
+            ))
+
+        return lines
+
     def val_value(self):
         try:
-            s = repr(bytes(self.val))
-            if s.startswith("b'"):
-                s = s[2:-1] # strip preceding b' and trailing '
+            view = self._get_view()
+
+            if self.SHOW_HEXDUMP:
+                lines = []
+                prev_stop = 0
+                for offset, v in self._get_slices(view, self.HEXDUMP_WIDTH):
+                    if offset > prev_stop:
+                        omitted = offset - prev_stop
+                        lines.append(self._get_omitted_value(omitted))
+
+                    lines.extend(self._get_hexdump_value(offset, v))
+                    prev_stop = offset + len(v)
+
+                s = "\n".join(lines)
+
+            else:
+                s = ""
+                prev_stop = 0
+                for offset, v in self._get_slices(view):
+                    if offset > prev_stop:
+                        s += self._get_omitted_value(offset - prev_stop)
+
+                    s += self._get_bytes_value(v)
+                    prev_stop = offset + len(v)
 
         except (TypeError, UnicodeError) as e:
             s = "<UNICODE ERROR>"
@@ -1849,3 +2523,486 @@ class ASTValue(InstanceValue):
     def val_value(self):
         return ast.dump(self.val, indent=self.INDENT_STRING)
 
+
+
+class Snapshot(object):
+    """A bounded copy of a value that can be safely rendered later, on another
+    thread, even if the original value has been changed since
+
+    Immutable values (strings, numbers, dates, classes, functions) are used
+    as is, builtin containers are copied into the Snapshot* subclasses, which
+    remember the original length and id, and everything else becomes a
+    SnapshotObject holding the instance's attributes
+
+    Containers hold at most ITERATE_LIMIT + 1 items (so the Value will still
+    show how many were truncated), bytes-like values only keep the head and
+    tail that BytesValue would print, and nothing deeper than OBJECT_DEPTH is
+    copied
+    """
+    ATOM_TYPES = (
+        type(None),
+        bool,
+        int,
+        float,
+        complex,
+        str,
+        bytes,
+        range,
+        slice,
+        decimal.Decimal,
+        fractions.Fraction,
+        datetime.date,
+        datetime.time,
+        datetime.timedelta,
+        datetime.tzinfo,
+        uuid.UUID,
+        PurePath,
+        enum.Enum,
+        re.Pattern,
+        type,
+        types.ModuleType,
+        types.FunctionType,
+        types.BuiltinFunctionType,
+        types.MethodType,
+        types.CodeType,
+    )
+    """Values of these types are immutable (or close enough) so they aren't
+    copied"""
+
+    snapshot_id = 0
+    """The id of the original value"""
+
+    snapshot_class = None
+    """The class of the original value"""
+
+    snapshot_len = None
+    """The length of the original value"""
+
+    namedtuple_classes = {}
+    """Holds the snapshot class of each namedtuple class, see
+    .create_namedtuple()"""
+
+    @classmethod
+    def create_safe(cls, val, depth=0, memo=None, hashable=False, **kwargs):
+        """Returns a snapshot of val, if val can't be snapshotted (or the
+        snapshot can't be hashed when it has to be) then val's repr is
+        returned instead, this never raises
+
+        :param hashable: bool, True if the snapshot will be a dict key or a
+            set item
+        :returns: Any, see .create()
+        """
+        try:
+            ret = cls.create(val, depth, memo, **kwargs)
+            if hashable:
+                hash(ret)
+
+        except Exception:
+            try:
+                ret = repr(val)
+
+            except Exception:
+                ret = object.__repr__(val)
+
+        return ret
+
+    @classmethod
+    def create(cls, val, depth=0, memo=None, **kwargs):
+        """Returns a snapshot of val
+
+        :param val: Any
+        :param depth: int, how deep val is in the value being copied
+        :param memo: dict, the snapshots that have been created so far keyed
+            by the original value's id, this keeps shared and recursive
+            references
+        :keyword iterate_limit: int, defaults to Value.ITERATE_LIMIT
+        :keyword object_depth: int, defaults to Value.OBJECT_DEPTH
+        :keyword object_string_limit: int, defaults to
+            Value.OBJECT_STRING_LIMIT
+        :returns: Any
+        """
+        if isinstance(val, cls.ATOM_TYPES):
+            return val
+
+        if memo is None:
+            memo = {}
+
+        if (ret := memo.get(id(val))) is not None:
+            return ret
+
+        iterate_limit = kwargs.get("iterate_limit", Value.ITERATE_LIMIT)
+        object_depth = kwargs.get("object_depth", Value.OBJECT_DEPTH)
+        limit = iterate_limit + 1 if iterate_limit > 0 else None
+        child_depth = depth + 1
+
+        if object_depth > 0 and depth >= object_depth:
+            ret = SnapshotObject.create_instance(val)
+            memo[id(val)] = ret
+            return ret
+
+        if isinstance(val, (bytearray, memoryview)):
+            ret = SnapshotBytes.create_bytes(
+                val,
+                kwargs.get("bytes_limit", Value.BYTES_LIMIT),
+            )
+
+        elif isinstance(val, array.array):
+            ret = SnapshotArray.create_instance(
+                val,
+                val.typecode,
+                val[:limit] if limit else val,
+            )
+
+        elif isinstance(val, (dict, MappingProxyType)):
+            ret = SnapshotDict.create_instance(val)
+            memo[id(val)] = ret
+            for count, (k, v) in enumerate(val.items(), 1):
+                k = cls.create_safe(
+                    k,
+                    child_depth,
+                    memo,
+                    hashable=True,
+                    **kwargs
+                )
+                ret[k] = cls.create_safe(v, child_depth, memo, **kwargs)
+                if limit and count >= limit:
+                    break
+
+        elif isinstance(val, list):
+            ret = SnapshotList.create_instance(val)
+            memo[id(val)] = ret
+            for count, v in enumerate(val, 1):
+                ret.append(cls.create_safe(v, child_depth, memo, **kwargs))
+                if limit and count >= limit:
+                    break
+
+        elif isinstance(val, tuple) and hasattr(val, "_fields"):
+            # namedtuples have a fixed number of fields so they can't be
+            # truncated
+            items = [
+                cls.create_safe(v, child_depth, memo, **kwargs) for v in val
+            ]
+            ret = cls.create_namedtuple(val, items)
+
+        elif isinstance(val, tuple):
+            items = []
+            for count, v in enumerate(val, 1):
+                items.append(cls.create_safe(v, child_depth, memo, **kwargs))
+                if limit and count >= limit:
+                    break
+
+            ret = SnapshotTuple.create_instance(val, items)
+
+        elif isinstance(val, frozenset):
+            items = []
+            for count, v in enumerate(val, 1):
+                items.append(cls.create_safe(
+                    v,
+                    child_depth,
+                    memo,
+                    hashable=True,
+                    **kwargs
+                ))
+                if limit and count >= limit:
+                    break
+
+            ret = SnapshotFrozenSet.create_instance(val, items)
+
+        elif isinstance(val, set):
+            ret = SnapshotSet.create_instance(val)
+            memo[id(val)] = ret
+            for count, v in enumerate(val, 1):
+                ret.add(cls.create_safe(
+                    v,
+                    child_depth,
+                    memo,
+                    hashable=True,
+                    **kwargs
+                ))
+                if limit and count >= limit:
+                    break
+
+        else:
+            ret = SnapshotObject.create_object(
+                val,
+                kwargs.get("object_string_limit", Value.OBJECT_STRING_LIMIT),
+            )
+            memo[id(val)] = ret
+            try:
+                names = FieldsValue.get_fields(type(val))
+                if names is None:
+                    names = list(vars(val).keys())
+
+            except TypeError:
+                names = []
+
+            for count, name in enumerate(names, 1):
+                try:
+                    v = getattr(val, name)
+
+                except Exception:
+                    continue
+
+                ret.snapshot_attrs[name] = cls.create_safe(
+                    v,
+                    child_depth,
+                    memo,
+                    **kwargs
+                )
+
+                if limit and count >= limit:
+                    break
+
+        if ret is not val:
+            memo[id(val)] = ret
+
+        return ret
+
+    @classmethod
+    def create_instance(cls, val, *args):
+        """Create an empty snapshot instance that remembers val's id and
+        length"""
+        instance = cls(*args)
+        instance.snapshot_id = id(val)
+        instance.snapshot_class = type(val)
+        try:
+            instance.snapshot_len = len(val)
+
+        except Exception:
+            instance.snapshot_len = None
+
+        return instance
+
+    @classmethod
+    def create_namedtuple(cls, val, items):
+        """Create a snapshot of namedtuple val that is still an instance of
+        val's class so it is rendered like val
+
+        :param val: NamedTuple
+        :param items: list, the snapshots of val's fields
+        :returns: Snapshot
+        """
+        val_class = type(val)
+        snapshot_class = cls.namedtuple_classes.get(val_class)
+        if snapshot_class is None:
+            snapshot_class = type(
+                val_class.__name__,
+                (Snapshot, val_class),
+                {"__module__": val_class.__module__},
+            )
+            cls.namedtuple_classes[val_class] = snapshot_class
+
+        # tuple.__new__ skips any custom __new__ of the namedtuple
+        instance = tuple.__new__(snapshot_class, items)
+        instance.snapshot_id = id(val)
+        instance.snapshot_class = val_class
+        instance.snapshot_len = len(val)
+        return instance
+
+    def __len__(self):
+        return self.snapshot_len
+
+
+class SnapshotDict(Snapshot, dict):
+    pass
+
+
+class SnapshotList(Snapshot, list):
+    pass
+
+
+class SnapshotTuple(Snapshot, tuple):
+    pass
+
+
+class SnapshotSet(Snapshot, set):
+    pass
+
+
+class SnapshotFrozenSet(Snapshot, frozenset):
+    def __repr__(self):
+        # dict keys are printed with their repr
+        name = self.snapshot_class.__name__
+        return "{}({})".format(name, repr(set(self)) if self else "")
+
+
+class SnapshotArray(Snapshot, array.array):
+    pass
+
+
+class SnapshotBytes(Snapshot, bytes):
+    """The snapshot of a bytearray or memoryview, if the value is longer than
+    BYTES_LIMIT then only the head and tail BytesValue would print are kept,
+    see .get_slices()"""
+    snapshot_head = 0
+    """How many bytes of the head were kept"""
+
+    snapshot_tail = 0
+    """Where the kept tail starts in the original value"""
+
+    snapshot_nbytes = 0
+    """How many bytes the original value has"""
+
+    @classmethod
+    def create_bytes(cls, val, limit):
+        """
+        :param val: bytearray|memoryview
+        :param limit: int, the BYTES_LIMIT the value will be rendered with
+        :returns: SnapshotBytes
+        """
+        view = memoryview(val)
+        if view.ndim != 1 or view.format != "B":
+            try:
+                view = view.cast("B")
+
+            except TypeError:
+                view = memoryview(bytes(view))
+
+        total = len(view)
+        # the head and tail are widened so they hold the slices for any
+        # alignment BytesValue uses
+        align = BytesValue.HEXDUMP_WIDTH
+        if limit <= 0 or total <= limit + (2 * align):
+            instance = cls.create_instance(val, view)
+            instance.snapshot_head = total
+            instance.snapshot_tail = total
+
+        else:
+            head = max(limit // 2, align)
+            tail = total - limit
+            tail -= tail % align
+            instance = cls.create_instance(
+                val,
+                bytes(view[:head]) + bytes(view[tail:])
+            )
+            instance.snapshot_head = head
+            instance.snapshot_tail = tail
+
+        instance.snapshot_nbytes = total
+        return instance
+
+    def get_slices(self, slices):
+        """Map the (offset, stop) slices of the original value to the kept
+        bytes
+
+        :param slices: list[tuple[int, int]]
+        :returns: list[tuple[int, memoryview]]
+        """
+        view = memoryview(self)
+        ret = []
+        for start, stop in slices:
+            offset = start
+            if start >= self.snapshot_tail:
+                start = self.snapshot_head + (start - self.snapshot_tail)
+                stop = self.snapshot_head + (stop - self.snapshot_tail)
+
+            ret.append((offset, view[start:stop]))
+
+        return ret
+
+
+class SnapshotObject(Snapshot):
+    """The snapshot of an instance, this holds the instance's class name and
+    the snapshots of its attributes"""
+    snapshot_repr = None
+    """The repr of the original instance, this is what is printed when the
+    snapshot is a dict key or set item"""
+
+    snapshot_str = None
+    """The __str__ of the original instance, see Value.get_object_string"""
+
+    snapshot_strlen = 0
+    """The length of the original instance's full __str__"""
+
+    @classmethod
+    def create_object(cls, val, limit):
+        """Create an empty snapshot of instance val that remembers val's repr
+        and __str__ (both truncated to limit characters)
+
+        :param val: Any
+        :param limit: int, usually Value.OBJECT_STRING_LIMIT
+        :returns: SnapshotObject
+        """
+        instance = cls.create_instance(val)
+        try:
+            s_repr = String(repr(val))
+
+        except Exception:
+            s_repr = String(object.__repr__(val))
+
+        if len(s_repr) > limit:
+            s_repr = s_repr.truncate(limit - 3) + "..."
+
+        instance.snapshot_repr = s_repr
+        instance.snapshot_str, instance.snapshot_strlen = (
+            Value.get_object_string(val, limit)
+        )
+        return instance
+
+    def __init__(self):
+        self.snapshot_attrs = {}
+
+    def __len__(self):
+        return len(self.snapshot_attrs)
+
+    def __repr__(self):
+        if self.snapshot_repr is None:
+            return super().__repr__()
+
+        return self.snapshot_repr
+
+    def __str__(self):
+        if self.snapshot_str is None:
+            return repr(self)
+
+        return self.snapshot_str
+
+
+class SnapshotValue(InstanceValue):
+    """Renders a SnapshotObject, see Snapshot"""
+    SHOW_INSTANCE_ID = True
+
+    @classmethod
+    def is_valid(cls, val):
+        return isinstance(val, SnapshotObject)
+
+    def count_value(self):
+        if not self.val.snapshot_attrs:
+            return self.val.snapshot_len
+
+    def has_body(self):
+        return (
+            True if self.val.snapshot_attrs
+            else self.val.snapshot_str is not None
+        )
+
+    def empty_value(self):
+        start_wrapper = self.start_object_value()
+        stop_wrapper = self.stop_object_value()
+        prefix = self.prefix_value()
+        return Color.color_meta(f"{start_wrapper}{prefix}{stop_wrapper}")
+
+    def val_value(self):
+        """Renders the snapshot like InstanceValue.object_value renders the
+        original instance, minus the class properties and methods"""
+        s_body = ""
+        if val_class := self.val.snapshot_class:
+            s_body += self.classes_value(val_class)
+
+        if self.SHOW_OBJECT_STRING and self.val.snapshot_str is not None:
+            s_body += self.object_string_value(
+                self.val.snapshot_str,
+                self.val.snapshot_strlen,
+            )
+
+        if attrs := self.val.snapshot_attrs:
+            header = Color.color_header(f"Instance Properties ({len(attrs)})")
+            s_body += f"\n{header}:\n"
+            for k, v in OrderedItems(attrs):
+                s_attr = "{} = {}".format(
+                    Color.color_attr(k),
+                    self.get_instance(v).string_value()
+                )
+                s_body += self._add_indent(s_attr, 1) + "\n"
+
+        return s_body.strip()
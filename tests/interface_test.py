@@ -8,6 +8,14 @@ import os
 import re
 import logging
 import json
+import asyncio
+import threading
+import io
+import dataclasses
+import tracemalloc
+import gc
+import pstats
+import cProfile
 
 # this is the local pout that is going to be tested
 import pout
@@ -15,7 +23,7 @@ from pout.compat import *
 from pout.interface import V
 from pout import environ
 
-from . import testdata, TestCase
+from . import testdata, TestCase, SkipTest
 
 
 class Foo(object):
@@ -211,6 +219,266 @@ class PTest(TestCase):
                 time.sleep(0.25)
         self.assertTrue("with foo -" in c)
 
+    def test_p_resolution(self):
+        with testdata.capture() as c:
+            with pout.p("empty") as p:
+                pass
+        self.assertTrue(" us\n" in c or " ns\n" in c, c)
+        self.assertTrue("cpu: " in c)
+        self.assertLess(p.wall_ns, 1000000)
+
+        with testdata.capture() as c:
+            with pout.p("sleep") as p:
+                time.sleep(0.01)
+        self.assertLessEqual(10000000, p.wall_ns)
+        # sleeping doesn't use the cpu
+        self.assertLess(p.thread_ns, p.wall_ns)
+
+    def test_p_aggregate(self):
+        P = pout.interface.P
+        P.stats = {}
+        with testdata.capture() as c:
+            for i in range(100):
+                with pout.p("agg", aggregate=True):
+                    pass
+        self.assertEqual("", str(c))
+        self.assertEqual(100, P.stats["agg"].count)
+
+        with testdata.capture() as c:
+            pout.p.report(reset=True)
+        self.assertTrue("p99" in c)
+        self.assertTrue("agg  |   100 |" in c)
+        self.assertEqual({}, P.stats)
+
+    def test_p_report_rows(self):
+        """every section is printed in a bare table and long names aren't
+        truncated"""
+        P = pout.interface.P
+        P.stats = {}
+        for i in range(150):
+            with pout.p("section-{:03d}-{}".format(i, "x" * i), aggregate=True):
+                pass
+
+        with testdata.capture() as c:
+            pout.p.report(reset=True)
+
+        self.assertTrue("section-149-{} |".format("x" * 149) in c)
+        self.assertFalse("Truncated" in c)
+        self.assertFalse("[" in c)
+        self.assertTrue("\nname " in c)
+        self.assertEqual(150, c.count("section-"))
+
+    def test_p_concurrent(self):
+        """each thread and asyncio task has its own profile stack
+
+        this runs in its own process because reflecting thousands of calls
+        is a lot slower with pytest's deep stack"""
+        script = testdata.create_file([
+            "import time",
+            "import asyncio",
+            "import threading",
+            "import pout",
+            "",
+            "def thread_target(i):",
+            "    pout.p(f'thread-{i}', aggregate=True)",
+            "    pout.p('inner', aggregate=True)",
+            "    time.sleep(0.01)",
+            "    pout.p()",
+            "    pout.p()",
+            "",
+            "threads = [",
+            "    threading.Thread(target=thread_target, args=(i,))",
+            "    for i in range(64)",
+            "]",
+            "for t in threads:",
+            "    t.start()",
+            "for t in threads:",
+            "    t.join()",
+            "",
+            "async def task(i):",
+            "    with pout.p(f'task-{i}', aggregate=True):",
+            "        await asyncio.sleep(0)",
+            "        with pout.p('inner', aggregate=True):",
+            "            await asyncio.sleep(0)",
+            "",
+            "async def main():",
+            "    with pout.p('main', aggregate=True):",
+            "        await asyncio.gather(*(task(i) for i in range(1000)))",
+            "",
+            "asyncio.run(main())",
+            "",
+            "expected = {'main'}",
+            "for i in range(64):",
+            "    expected.add(f'thread-{i}')",
+            "    expected.add(f'thread-{i} > inner')",
+            "for i in range(1000):",
+            "    expected.add(f'main > task-{i}')",
+            "    expected.add(f'main > task-{i} > inner')",
+            "",
+            "P = pout.interface.P",
+            "print('missing', len(expected - set(P.stats)))",
+            "print('unexpected', len(set(P.stats) - expected))",
+            "print('counts', set(h.count for h in P.stats.values()))",
+            "print('stack', len(P.stack.get()))",
+            "P.stats = {}",
+        ])
+        r = script.run()
+        self.assertTrue("missing 0" in r, r)
+        self.assertTrue("unexpected 0" in r, r)
+        self.assertTrue("counts {1}" in r, r)
+        self.assertTrue("stack 0" in r, r)
+
+    def test_p_decorator(self):
+        P = pout.interface.P
+        P.stats = {}
+
+        @pout.p
+        def foo(x):
+            return x * 2
+
+        @pout.p("bar section")
+        async def bar():
+            with pout.p("bar inner", aggregate=True):
+                return foo(2)
+
+        with testdata.capture() as c:
+            for i in range(10):
+                self.assertEqual(i * 2, foo(i))
+
+            self.assertEqual(4, asyncio.run(bar()))
+
+        self.assertEqual("", str(c))
+        self.assertEqual((), P.stack.get())
+        self.assertEqual("foo", foo.__name__)
+        # decorated functions are keyed by their name wherever they are called
+        self.assertEqual(11, P.stats[foo.__qualname__].count)
+        self.assertEqual(1, P.stats["bar section"].count)
+        self.assertEqual(1, P.stats["bar inner"].count)
+
+        P.ENABLED = False
+        try:
+            foo(1)
+
+        finally:
+            P.ENABLED = True
+
+        self.assertEqual(11, P.stats[foo.__qualname__].count)
+        P.stats = {}
+
+    def test_p_decorator_recursive(self):
+        P = pout.interface.P
+        P.stats = {}
+
+        @pout.p
+        def fact(n):
+            return n * fact(n - 1) if n > 1 else 1
+
+        with pout.p("outer", aggregate=True):
+            self.assertEqual(265252859812191058636308480000000, fact(30))
+
+        fact(5)
+
+        self.assertEqual({"outer", fact.__qualname__}, set(P.stats))
+        self.assertEqual(2, P.stats[fact.__qualname__].count)
+        self.assertEqual((), P.stack.get())
+        P.stats = {}
+
+    def test_p_profile(self):
+        def foo():
+            return sum(range(1000))
+
+        path = testdata.get_file("pout.prof")
+        with testdata.capture() as c:
+            with pout.p("prof", profile=True, top=3, prof_path=path):
+                foo()
+
+            pout.p("prof call", profile=True)
+            foo()
+            pout.p()
+
+        self.assertEqual(2, c.count("Cumulative (top"))
+        self.assertRegex(str(c), r"\n *calls \| cumulative \| +self \| function")
+        self.assertTrue("foo (tests/interface_test.py:" in c)
+        self.assertFalse("stop_profiler" in c)
+        self.assertFalse("time.perf_counter_ns" in c)
+
+        stats = pstats.Stats(str(path))
+        self.assertTrue(any(k[2] == "foo" for k in stats.stats))
+
+        # the profilers were stopped so another one can start
+        profiler = cProfile.Profile()
+        profiler.enable()
+        profiler.disable()
+
+    def test_get_duration(self):
+        p = pout.interface.P
+        self.assertEqual("850 ns", p.get_duration(850))
+        self.assertEqual("12.345 us", p.get_duration(12345))
+        self.assertEqual("1.500 ms", p.get_duration(1500000))
+        self.assertEqual("2.000 s", p.get_duration(2000000000))
+
+
+class SampleTest(TestCase):
+    def spin(self, seconds=0.05):
+        start = time.time()
+        while time.time() - start < seconds:
+            pass
+
+    def test_top(self):
+        switch_interval = sys.getswitchinterval()
+        with testdata.capture() as c:
+            with pout.sample(interval_ms=1, top=5):
+                self.spin()
+
+        self.assertTrue("Functions" in c)
+        self.assertTrue("SampleTest.spin (" in c)
+        self.assertTrue("\nself | self % | total | total % | function" in c)
+        self.assertFalse("Sample.__exit__" in c)
+        self.assertEqual(switch_interval, sys.getswitchinterval())
+
+    def test_nested(self):
+        switch_interval = sys.getswitchinterval()
+        with testdata.capture() as c:
+            with pout.sample(interval_ms=2):
+                self.assertEqual(0.002, sys.getswitchinterval())
+                with pout.sample(interval_ms=1):
+                    self.assertEqual(0.001, sys.getswitchinterval())
+                    self.spin()
+
+                # the outer sampler is still running
+                self.assertEqual(0.002, sys.getswitchinterval())
+                self.spin()
+
+        self.assertEqual(switch_interval, sys.getswitchinterval())
+
+        # samplers that stop in a different order than they started
+        s1 = pout.sample(interval_ms=1)
+        s2 = pout.sample(interval_ms=2)
+        with testdata.capture() as c:
+            s1.__enter__()
+            s2.__enter__()
+            s1.__exit__(None, None, None)
+            self.assertEqual(0.002, sys.getswitchinterval())
+            s2.__exit__(None, None, None)
+
+        self.assertEqual(switch_interval, sys.getswitchinterval())
+
+    def test_collapsed(self):
+        path = testdata.get_file("pout.folded")
+        with testdata.capture() as c:
+            with pout.sample(path=path):
+                self.spin()
+
+        self.assertTrue(str(path) in c)
+        lines = path.read_text().splitlines()
+        self.assertLess(0, len(lines))
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertTrue(
+            "SampleTest.spin ({}:".format(pout.path.Path(__file__))
+            in stack.split(";")[-1]
+        )
+        self.assertLess(0, int(count))
+
 
 class XTest(TestCase):
     def test_x(self):
@@ -233,6 +501,20 @@ class XTest(TestCase):
         r = path.run(code=1)
         self.assertTrue("exit at line " in r)
 
+    def test_async_mode(self):
+        path = testdata.create_file([
+            "import asyncio",
+            "import pout",
+            "",
+            "async def main():",
+            "    v = 'xx'",
+            "    pout.x(v, async_mode=True)",
+            "",
+            "asyncio.run(main())",
+        ])
+        r = path.run(code=1)
+        self.assertTrue("xx" in r)
+
 
 class SleepTest(TestCase):
     def test_run(self):
@@ -322,6 +604,140 @@ class STest(TestCase):
         self.assertTrue('foo' in r)
 
 
+class AVTest(TestCase):
+    def test_av(self):
+        threads = []
+
+        class Foo(object):
+            def __str__(self):
+                threads.append(threading.current_thread())
+                return "foo"
+
+        async def run():
+            foo = Foo()
+            r = pout.av(foo)
+            self.assertTrue(asyncio.isfuture(r))
+            return await r
+
+        with testdata.capture() as c:
+            r = asyncio.run(run())
+
+        self.assertIsNone(r)
+        self.assertTrue("foo = " in c, c)
+        self.assertTrue("interface_test.py" in c, c)
+        self.assertNotEqual(threading.current_thread(), threads[0])
+
+    def test_async_mode(self):
+        async def run():
+            foo = "bar"
+            return await pout.s(foo, async_mode=True)
+
+        r = asyncio.run(run())
+        self.assertTrue("foo = " in r)
+        self.assertTrue("bar" in r)
+
+    def test_async_mode_unsupported(self):
+        async def run():
+            with pout.m(async_mode=True):
+                pass
+
+        with self.assertRaises(ValueError):
+            asyncio.run(run())
+
+        with self.assertRaises(ValueError):
+            pout.p("foo", async_mode=True)
+        self.assertEqual((), pout.interface.P.stack.get())
+
+
+class JsonStreamTest(TestCase):
+    def test_records(self):
+        buf = io.StringIO()
+        stream = pout.utils.JsonStream(
+            pout.utils.BufferedStream(buf, flush_lines=0)
+        )
+        orig_stream = pout.stream
+        pout.stream = stream
+        try:
+            foo = [1, 2]
+            bar = Foo()
+            pout.v(foo, bar)
+            pout.h()
+
+        finally:
+            pout.stream = orig_stream
+
+        stream.flush()
+        lines = buf.getvalue().splitlines()
+        self.assertEqual(2, len(lines))
+
+        r = json.loads(lines[0])
+        self.assertEqual(os.getpid(), r["pid"])
+        self.assertEqual(threading.current_thread().name, r["thread"])
+        self.assertEqual("v", r["interface"])
+        self.assertTrue(r["file"].endswith("interface_test.py"))
+        self.assertEqual(
+            [
+                {"name": "foo", "type": "list"},
+                {"name": "bar", "type": "tests.interface_test.Foo"},
+            ],
+            r["args"]
+        )
+        self.assertTrue(r["text"].startswith("foo = list (2)"), r["text"])
+
+        r = json.loads(lines[1])
+        self.assertEqual("h", r["interface"])
+
+    def test_queue(self):
+        buf = io.StringIO()
+        stream = pout.utils.JsonStream(
+            pout.utils.QueueStream(
+                pout.utils.BufferedStream(buf, flush_lines=0)
+            )
+        )
+        stream.writeline("foo")
+        stream.flush()
+        self.assertEqual({"text": "foo"}, json.loads(buf.getvalue()))
+
+
+class DeferredTest(TestCase):
+    def test_deferred(self):
+        foo = {"bar": [1, 2]}
+        with testdata.capture() as c:
+            f = pout.v(foo, deferred=True)
+            foo["bar"].append(3)
+            f.result()
+
+        self.assertTrue("foo = dict (1)" in c, c)
+        self.assertTrue("1: 2" in c, c)
+        self.assertFalse("2: 3" in c, c)
+
+    def test_return_output(self):
+        foo = 1
+        s = pout.s(foo, deferred=True)
+        self.assertTrue("foo = 1" in s)
+
+    def test_frozenset(self):
+        foo = {frozenset({1}): 1}
+        bar = {frozenset({2})}
+        with testdata.capture() as c:
+            pout.v(foo, bar, deferred=True).result()
+
+        self.assertTrue("frozenset({1}): 1" in c, c)
+        self.assertTrue("set (1)" in c, c)
+
+    def test_object_key(self):
+        @dataclasses.dataclass(frozen=True)
+        class K(object):
+            a: int
+
+        foo = {K(1): [1, 2]}
+        s1 = pout.s(foo)
+        s2 = pout.s(foo, deferred=True)
+        # the bodies are the same, the call lines are different
+        self.assertEqual(s1.splitlines()[:-1], s2.splitlines()[:-1])
+        self.assertTrue("K(a=1): list (2)" in s1, s1)
+
+
 class RTest(TestCase):
     def test_run(self):
         path = testdata.create_file([
@@ -860,12 +1276,99 @@ class VTest(TestCase):
         pout.v(v)
 
 
+class GCTest(TestCase):
+    def test_gc(self):
+        callbacks = list(gc.callbacks)
+        with testdata.capture() as c:
+            with pout.gc("block"):
+                gc.collect()
+
+        self.assertEqual(callbacks, gc.callbacks)
+        self.assertTrue("block: " in c)
+        self.assertTrue("max pause" in c)
+        self.assertTrue("uncollectable" in c)
+        self.assertTrue("\ngeneration | collections | total pause" in c)
+
+    def test_empty(self):
+        with testdata.capture() as c:
+            with pout.gc():
+                pass
+
+        self.assertTrue("0 collections" in c)
+
+
 class MTest(TestCase):
     def test_m(self):
         pout.m() # around 11
         l = list(range(1, 1000000))
         pout.m("after big list creation") # around 43
 
+    def test_with(self):
+        if pout.interface.M.get_rss() is None:
+            raise SkipTest("Current memory is not supported")
+
+        with testdata.capture() as c:
+            with pout.m("block", interval_ms=1):
+                b = bytearray(20 * 1024 * 1024)
+                time.sleep(0.01)
+                del b
+
+        self.assertEqual(1, c.count("block: "))
+        self.assertTrue("rss " in c)
+        self.assertTrue(" -> " in c)
+        peak = float(re.search(r"peak ([\d.]+) MB", str(c)).group(1))
+        after = float(re.search(r"rss [\d.]+ MB -> ([\d.]+) MB", str(c)).group(1))
+        self.assertLess(after + 15, peak)
+
+    def test_return_output(self):
+        with testdata.capture() as c:
+            r = pout.m("returned", return_output=True)
+            print("after")
+
+        self.assertTrue(r.startswith("returned: "))
+        # the assigned call is printed right away
+        self.assertLess(c.index("returned: "), c.index("after"))
+
+    def test_get_size(self):
+        self.assertEqual("unknown", pout.interface.M.get_size(None))
+        self.assertEqual("+512 B", pout.interface.M.get_size(512, sign=True))
+        self.assertEqual("-1.50 KB", pout.interface.Alloc.get_size(-1536))
+        self.assertEqual("2.00 MB", pout.interface.M.get_size(2 << 20))
+
+
+class AllocTest(TestCase):
+    def allocate(self):
+        return [bytearray(1024) for _ in range(100)]
+
+    def test_lineno(self):
+        with testdata.capture() as c:
+            with pout.alloc("block", top=5):
+                keep = self.allocate()
+
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertTrue("block: +" in c)
+        self.assertTrue("interface_test.py:" in c)
+        self.assertRegex(str(c), r"\n *size \| blocks \| +total \| location")
+        self.assertFalse("pout/interface.py" in c)
+
+    def test_traceback(self):
+        with testdata.capture() as c:
+            with pout.alloc(
+                group_by="traceback",
+                paths=os.path.dirname(__file__),
+                top=1,
+            ):
+                keep = self.allocate()
+
+        lines = [l for l in str(c).splitlines() if "interface_test.py:" in l]
+        self.assertEqual(2, len(lines))
+        self.assertTrue("1. +" in c)
+
+    def test_group_by(self):
+        with self.assertRaises(ValueError):
+            with pout.alloc(group_by="foo"):
+                pass
+
 
 class ITest(TestCase):
     def test_class_info(self):
@@ -984,3 +1487,56 @@ class ToFileTest(TestCase):
             pout.v("after tofile")
         self.assertTrue("after tofile" in c)
 
+    def test_tofile_paths(self):
+        path1 = testdata.get_file("pout1.txt")
+        path2 = testdata.get_file("pout2.txt")
+        with pout.tofile(path1):
+            pout.v("first")
+            with pout.tofile(path2):
+                pout.v("second")
+
+            with pout.tofile(path1):
+                pout.v("third")
+
+        r1 = path1.read_text()
+        r2 = path2.read_text()
+        self.assertTrue("first" in r1 and "third" in r1, r1)
+        self.assertFalse("second" in r1, r1)
+        self.assertTrue("second" in r2, r2)
+        self.assertFalse(str(path1) in pout.utils.FileStream.pool)
+
+    def test_tofile_fork(self):
+        if not hasattr(os, "fork"):
+            raise SkipTest("os.fork is not supported")
+
+        path = testdata.get_file("pout.txt")
+        script = testdata.create_file([
+            "# -*- coding: utf-8 -*-",
+            "import os",
+            "import pout",
+            "",
+            "s = 'x' * 10000",
+            f"with pout.tofile({str(path)!r}):",
+            "    pids = []",
+            "    for i in range(4):",
+            "        pid = os.fork()",
+            "        if pid == 0:",
+            "            for j in range(20):",
+            "                pout.vs(s)",
+            "            os._exit(0)",
+            "        pids.append(pid)",
+            "",
+            "    for j in range(20):",
+            "        pout.vs(s)",
+            "",
+            "    for pid in pids:",
+            "        os.waitpid(pid, 0)",
+        ])
+        script.run()
+
+        # every record was written whole so no run of x's was split
+        runs = re.findall(r"x+", path.read_text())
+        self.assertEqual(100, len(runs))
+        for run in runs:
+            self.assertEqual(10000, len(run))
+
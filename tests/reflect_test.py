@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import gc
+import weakref
 
 from . import testdata, TestCase
 
@@ -29,6 +31,27 @@ class ReflectTest(TestCase):
         self.assertTrue("foo" in c)
 
 
+    def test_frames_released(self):
+        """the caller's locals shouldn't be kept alive by the pout call until
+        the garbage collector runs"""
+        class Foo(object):
+            pass
+
+        def caller():
+            foo = Foo()
+            with testdata.capture():
+                pout.v(foo)
+            return weakref.ref(foo)
+
+        gc.disable()
+        try:
+            r = caller()
+            self.assertIsNone(r())
+
+        finally:
+            gc.enable()
+
+
 class CallStringTest(TestCase):
     def test_string_in_parse(self):
         """https://github.com/Jaymon/pout/issues/45"""
@@ -1,8 +1,37 @@
 # -*- coding: utf-8 -*-
 
+import os
+import sys
+import io
+import time
+import logging
+import threading
+import gzip
+import lzma
+import json
+import gc
+import re
+import subprocess
+
+import testdata
+
 import pout
 from pout.compat import *
-from pout.utils import String, Color
+from pout.utils import (
+    String,
+    Color,
+    Palette,
+    Stream,
+    StderrStream,
+    BufferedStream,
+    QueueStream,
+    RotatingFileStream,
+    RingStream,
+    FileStream,
+    JsonStream,
+    MultiStream,
+    Histogram,
+)
 from pout import environ
 
 from . import TestCase, SkipTest
@@ -29,6 +58,494 @@ class StringTest(TestCase):
         self.assertEqual("foo_bar", s)
 
 
+class HistogramTest(TestCase):
+    def test_percentile(self):
+        h = Histogram()
+        for i in range(1, 10001):
+            h.add(i)
+
+        self.assertEqual(10000, h.count)
+        self.assertEqual(1, h.min)
+        self.assertEqual(10000, h.max)
+        self.assertEqual(5000.5, h.mean)
+        for percent in [50, 95, 99]:
+            self.assertAlmostEqual(
+                percent * 100,
+                h.percentile(percent),
+                delta=percent * 100 * h.PRECISION
+            )
+
+        # memory depends on the range of values, not how many were added
+        buckets = len(h.buckets)
+        for i in range(1, 10001):
+            h.add(i)
+        self.assertEqual(buckets, len(h.buckets))
+
+    def test_empty(self):
+        h = Histogram()
+        self.assertEqual(0, h.percentile(50))
+        self.assertEqual(0, h.mean)
+
+        h.add(0)
+        self.assertEqual(0, h.percentile(99))
+
+
+class BufferedStreamTest(TestCase):
+    def test_flush_lines(self):
+        buf = io.StringIO()
+        s = BufferedStream(buf, flush_lines=2)
+        s.writeline("foo")
+        self.assertEqual("", buf.getvalue())
+        s.writeline("bar")
+        self.assertEqual("foo\nbar\n", buf.getvalue())
+
+    def test_buffer_size(self):
+        buf = io.StringIO()
+        s = BufferedStream(buf, buffer_size=10, flush_lines=0)
+        s.writeline("foo")
+        self.assertEqual("", buf.getvalue())
+        s.writeline("barche")
+        self.assertEqual("foo\nbarche\n", buf.getvalue())
+
+        s.writeline("baz")
+        s.flush()
+        self.assertEqual("foo\nbarche\nbaz\n", buf.getvalue())
+
+    def test_fileno(self):
+        path = testdata.create_file()
+        with open(path, "w") as fp:
+            s = BufferedStream(fp, flush_lines=0)
+            fp.write("foo\n")
+            s.writeline("bar \u00E7a")
+            s.flush()
+
+        self.assertEqual("foo\nbar \u00E7a\n", path.read_text())
+
+    def test_capture(self):
+        s = BufferedStream()
+        with testdata.capture() as c:
+            s.writeline("foo")
+        self.assertTrue("foo" in c)
+
+    def test_instances(self):
+        """streams aren't kept alive by the exit and fork hooks"""
+        count = len(BufferedStream.instances)
+        s = BufferedStream(io.StringIO())
+        self.assertEqual(count + 1, len(BufferedStream.instances))
+
+        del s
+        gc.collect()
+        self.assertEqual(count, len(BufferedStream.instances))
+
+    def test_broken_pipe(self):
+        class BrokenStream(io.StringIO):
+            def write(self, s):
+                raise BrokenPipeError(32, "Broken pipe")
+
+        s = BufferedStream(BrokenStream())
+        s.writeline("foo") # success if no error raised
+        self.assertEqual(0, len(s.buffer))
+
+    def test_benchmark(self):
+        """Compares the logging stream with the buffered stream
+
+        this is slow, so it only runs when POUT_BENCHMARK is set to the number
+        of writes (eg, POUT_BENCHMARK=100000)"""
+        count = int(os.environ.get("POUT_BENCHMARK", 0))
+        if not count:
+            raise SkipTest("Set POUT_BENCHMARK=100000 to run the benchmark")
+
+        orig_stream = pout.stream
+        s = pout.v(1, print_output=False, return_output=True)
+
+        with open(os.devnull, "w") as fp:
+            logging_stream = StderrStream()
+            handler = logging.StreamHandler(stream=fp)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logging_stream.logger = logging.Logger("benchmark")
+            logging_stream.logger.addHandler(handler)
+
+            for name, stream in [
+                ("logging", logging_stream),
+                ("buffered", BufferedStream(fp, flush_lines=0)),
+            ]:
+                pout.stream = stream
+                try:
+                    start = time.perf_counter()
+                    for i in range(count):
+                        pout.v(i)
+                    v_elapsed = time.perf_counter() - start
+
+                    # pout.v's reflection dominates the above time, so also
+                    # time just the stream writing a rendered pout.v output
+                    start = time.perf_counter()
+                    for i in range(count):
+                        stream.writeline(s)
+                    writeline_elapsed = time.perf_counter() - start
+
+                finally:
+                    pout.stream = orig_stream
+
+                print(
+                    "{} {}: {:.2f} pout.v/s, {:.2f} writeline/s".format(
+                        count,
+                        name,
+                        count / v_elapsed,
+                        count / writeline_elapsed,
+                    )
+                )
+
+                if name == "buffered":
+                    stream.flush()
+
+
+class QueueStreamTest(TestCase):
+    def create_stream(self, **kwargs):
+        """Returns a QueueStream that writes to a list, the returned event
+        needs to be set for the writer thread to start writing"""
+        class ListStream(Stream):
+            def __init__(self):
+                self.lines = []
+                self.event = threading.Event()
+
+            def writeline(self, s):
+                self.event.wait()
+                self.lines.append(s)
+
+        return QueueStream(ListStream(), **kwargs)
+
+    def test_writeline(self):
+        s = self.create_stream()
+        s.stream.event.set()
+        s.writeline("foo")
+        s.writeline(lambda: "bar")
+        s.flush()
+        self.assertEqual(["foo", "bar"], s.stream.lines)
+
+    def test_drop_newest(self):
+        s = self.create_stream(maxsize=2, policy="drop-newest")
+        for i in range(10):
+            s.writeline(str(i))
+
+        s.stream.event.set()
+        s.close()
+        lines = s.stream.lines
+        # the writer thread might have grabbed the first line before the
+        # queue filled up
+        self.assertTrue(lines[:2] == ["0", "1"], lines)
+        self.assertTrue("pout dropped" in lines[-1], lines)
+        self.assertEqual(10, len(lines) - 1 + s.dropped)
+
+    def test_drop_oldest(self):
+        s = self.create_stream(maxsize=2, policy="drop-oldest")
+        for i in range(10):
+            s.writeline(str(i))
+
+        s.stream.event.set()
+        s.close()
+        lines = s.stream.lines
+        self.assertEqual(["8", "9"], lines[-3:-1])
+        self.assertTrue("drop-oldest" in lines[-1], lines)
+
+    def test_block(self):
+        s = self.create_stream(maxsize=2, policy="block")
+        t = threading.Thread(
+            target=lambda: [s.writeline(str(i)) for i in range(10)]
+        )
+        t.start()
+        t.join(0.1)
+        self.assertTrue(t.is_alive())
+
+        s.stream.event.set()
+        t.join()
+        s.close()
+        self.assertEqual([str(i) for i in range(10)], s.stream.lines)
+        self.assertEqual(0, s.dropped)
+
+    def test_block_closed(self):
+        """a writer that was waiting for room when the stream closed still
+        gets its line written, and a stalled stream doesn't hang close"""
+        s = self.create_stream(maxsize=1, policy="block")
+        s.writeline("0")
+        s.writeline("1")
+        t = threading.Thread(target=lambda: s.writeline("2"))
+        t.start()
+        t.join(0.1)
+        self.assertTrue(t.is_alive())
+
+        with testdata.capture() as c:
+            s.close(timeout=0.1)
+        self.assertTrue("1 line because its stream stalled" in c, c)
+        self.assertEqual(1, s.dropped)
+
+        s.stream.event.set()
+        t.join()
+        s.thread.join()
+        self.assertEqual(["0", "2"], sorted(s.stream.lines))
+
+    def test_policy_error(self):
+        with self.assertRaises(ValueError):
+            QueueStream(BufferedStream(), policy="foo")
+
+
+class RotatingFileStreamTest(TestCase):
+    def test_max_bytes(self):
+        path = testdata.get_file("pout.txt")
+        s = RotatingFileStream(
+            path,
+            max_bytes=100,
+            compress="gzip",
+            grace=0,
+        )
+        for i in range(25):
+            s.writeline("line {:02d}".format(i))
+        s.get_executor().submit(lambda: None).result()
+        s.close()
+
+        segments = sorted(path.parent.glob("pout.txt.*.gz"))
+        self.assertLess(0, len(segments))
+        with gzip.open(segments[0], "rt") as fp:
+            self.assertTrue(fp.read().startswith("line 00\n"))
+
+        self.assertTrue("line 24" in path.read_text())
+        self.assertFalse(list(path.parent.glob("pout.txt.*[0-9]")))
+
+    def test_max_total(self):
+        path = testdata.get_file("pout.txt")
+        s = RotatingFileStream(
+            path,
+            max_bytes=1000,
+            compress="lzma",
+            max_total=2000,
+            grace=0,
+        )
+        for i in range(1000):
+            s.writeline("x" * 100)
+        s.get_executor().submit(lambda: None).result()
+        s.close()
+
+        segments = list(path.parent.glob("pout.txt.*.xz"))
+        self.assertLess(0, len(segments))
+        total = path.stat().st_size + sum(p.stat().st_size for p in segments)
+        self.assertLessEqual(total, 2000)
+        with lzma.open(segments[0], "rt") as fp:
+            self.assertTrue(fp.read().startswith("x" * 100))
+
+    def test_interval(self):
+        path = testdata.get_file("pout.txt")
+        s = RotatingFileStream(path, interval=0.01, compress="")
+        s.writeline("foo")
+        time.sleep(0.02)
+        s.writeline("bar")
+        s.close()
+
+        segments = list(path.parent.glob("pout.txt.*"))
+        self.assertEqual(1, len(segments))
+        self.assertEqual("foo\nbar\n", segments[0].read_text())
+
+    def test_tofile(self):
+        path = testdata.get_file("pout.txt")
+        with pout.tofile(path, max_bytes=100, grace=0):
+            for i in range(10):
+                pout.v(i)
+
+        RotatingFileStream.get_executor().submit(lambda: None).result()
+        self.assertLess(0, len(list(path.parent.glob("pout.txt.*.gz"))))
+
+    def test_processes(self):
+        """multiple processes rotating the same file don't lose lines, this
+        runs in its own process so the writers are forked from a process
+        that doesn't have any threads"""
+        path = testdata.get_file("pout.txt")
+        script = testdata.create_file([
+            "import os",
+            "import gzip",
+            "from pout.utils import RotatingFileStream",
+            "",
+            "path = {}".format(repr(str(path))),
+            "pids = []",
+            "for w in range(4):",
+            "    pid = os.fork()",
+            "    if pid == 0:",
+            "        s = RotatingFileStream(",
+            "            path,",
+            "            max_bytes=2000,",
+            "            compress='gzip',",
+            "            grace=0.1,",
+            "        )",
+            "        for i in range(2000):",
+            "            s.writeline('{} {}'.format(w, i))",
+            "        s.get_executor().shutdown(wait=True)",
+            "        s.close()",
+            "        os._exit(0)",
+            "    pids.append(pid)",
+            "",
+            "print('status', set(os.waitpid(pid, 0)[1] for pid in pids))",
+            "",
+            "lines = []",
+            "dirpath = os.path.dirname(path)",
+            "names = os.listdir(dirpath)",
+            "for name in names:",
+            "    p = os.path.join(dirpath, name)",
+            "    if name.endswith('.gz'):",
+            "        with gzip.open(p, 'rt') as fp:",
+            "            lines.extend(fp.read().splitlines())",
+            "    elif name.startswith('pout.txt'):",
+            "        with open(p) as fp:",
+            "            lines.extend(fp.read().splitlines())",
+            "",
+            "print('lines', len(lines), len(set(lines)))",
+            "print('segments', len([n for n in names if n.endswith('.gz')]))",
+        ])
+        r = script.run()
+        self.assertTrue("status {0}" in r, r)
+        self.assertTrue("lines 8000 8000" in r, r)
+        segments = int(re.search(r"segments (\d+)", r).group(1))
+        self.assertLess(1, segments)
+
+    def test_prune_pattern(self):
+        path = testdata.get_file("pout.txt")
+        other = testdata.create_file("other", path.parent / "pout.txt.bak")
+        s = RotatingFileStream(
+            path,
+            max_bytes=1000,
+            compress="gzip",
+            max_total=1,
+            grace=0,
+        )
+        for i in range(100):
+            s.writeline("x" * 100)
+        s.get_executor().submit(lambda: None).result()
+        s.close()
+
+        self.assertTrue(other.is_file())
+
+
+class RingStreamTest(TestCase):
+    def test_wrap(self):
+        path = testdata.get_file("pout.ring")
+        s = RingStream(path, size=100)
+        for i in range(100):
+            s.writeline("line {:02d}".format(i))
+
+        lines = [b.decode() for b in RingStream.read(path)]
+        # each line takes 4 + 7 bytes so 9 lines fit in 100 bytes
+        self.assertEqual(
+            ["line {:02d}".format(i) for i in range(91, 100)],
+            lines
+        )
+
+        # reopening the file keeps the lines
+        s = RingStream(path, size=100)
+        s.writeline("line 100")
+        lines = [b.decode() for b in RingStream.read(path)]
+        self.assertEqual("line 92", lines[0])
+        self.assertEqual("line 100", lines[-1])
+
+        # a different size starts over
+        s = RingStream(path, size=200)
+        self.assertEqual([], list(RingStream.read(path)))
+
+    def test_big_line(self):
+        path = testdata.get_file("pout.ring")
+        s = RingStream(path, size=20)
+        s.writeline("foo")
+        s.writeline("x" * 100)
+        self.assertEqual([b"x" * 16], list(RingStream.read(path)))
+
+    def test_not_ring(self):
+        path = testdata.create_file("foo" * 100)
+        with self.assertRaises(ValueError):
+            list(RingStream.read(path))
+
+    def test_dump(self):
+        path = testdata.get_file("pout.ring")
+        s = RingStream(path, size=200)
+        for i in range(50):
+            s.writeline("line {:02d}".format(i))
+
+        s.writeline(json.dumps({"text": "json line", "pid": 1234}))
+
+        output = subprocess.check_output(
+            [sys.executable, "-m", "pout", "ring", "dump", path],
+            env={"PYTHONPATH": os.path.abspath(os.path.expanduser("."))},
+            stderr=subprocess.STDOUT,
+        ).decode("utf-8")
+
+        lines = [line for line in output.splitlines() if line]
+        # the oldest lines were overwritten and the rest come back in order
+        self.assertEqual(
+            ["line {:02d}".format(i) for i in range(36, 50)],
+            lines[:-2]
+        )
+        self.assertEqual(["[1234]", "json line"], lines[-2:])
+
+        output = subprocess.check_output(
+            [sys.executable, "-m", "pout", "ring", "dump", "--raw", path],
+            env={"PYTHONPATH": os.path.abspath(os.path.expanduser("."))},
+            stderr=subprocess.STDOUT,
+        ).decode("utf-8")
+        self.assertTrue('"pid": 1234' in output)
+
+
+class MultiStreamTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        environ.SHOW_COLOR = True
+
+    @classmethod
+    def tearDownClass(cls):
+        environ.SHOW_COLOR = False
+
+    def test_sinks(self):
+        class ColorStream(BufferedStream):
+            def get_palette(self):
+                return Palette()
+
+        color_buf = io.StringIO()
+        plain_buf = io.StringIO()
+        json_buf = io.StringIO()
+        s = MultiStream(ColorStream(color_buf))
+        s.add(plain_buf, flush_lines=0)
+        s.add(JsonStream(BufferedStream(json_buf)), level="ERROR")
+        self.assertTrue(s.get_palette().enabled)
+
+        orig_stream = pout.stream
+        pout.stream = s
+        try:
+            pout.v({"foo": 1})
+            with self.assertRaises(ValueError):
+                with pout.e():
+                    raise ValueError("bar")
+
+        finally:
+            pout.stream = orig_stream
+
+        self.assertEqual("", plain_buf.getvalue())
+        s.flush()
+
+        self.assertTrue("\033[" in color_buf.getvalue())
+        self.assertTrue("'foo': 1" in plain_buf.getvalue())
+        self.assertFalse("\033[" in plain_buf.getvalue())
+        self.assertTrue("ValueError" in plain_buf.getvalue())
+
+        lines = json_buf.getvalue().splitlines()
+        self.assertEqual(1, len(lines))
+        record = json.loads(lines[0])
+        self.assertEqual("ERROR", record["level"])
+        self.assertEqual("e", record["interface"])
+
+    def test_remove(self):
+        buf = io.StringIO()
+        s = MultiStream(buf)
+        sink = s.add(io.StringIO())
+        s.remove(sink)
+        s.writeline("foo")
+        self.assertEqual("foo\n", buf.getvalue())
+        self.assertEqual(1, len(s.sinks))
+        self.assertFalse(s.get_palette().enabled)
+
+
 class ColorTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -48,6 +565,107 @@ class ColorTest(TestCase):
         else:
             raise SkipTest("Color is not supported")
 
+    def test_palette(self):
+        p = Palette()
+        text = p.color("foo bar", "red", bold=True)
+        self.assertEqual("\033[31;1mfoo bar\033[0m", text)
+        self.assertEqual("\033[97m", p.get_code("brightwhite"))
+        self.assertEqual("", p.get_code())
+        self.assertEqual("", p.color("", "red"))
+
+        p = Palette(False)
+        self.assertEqual("foo bar", p.color("foo bar", "red"))
+
+        environ.SHOW_COLOR = False
+        try:
+            self.assertEqual("foo bar", Palette().color("foo bar", "red"))
+
+        finally:
+            environ.SHOW_COLOR = True
+
+    def test_current(self):
+        token = Palette.current.set(Palette())
+        try:
+            self.assertTrue("31m" in Color.color("foo", "red"))
+
+        finally:
+            Palette.current.reset(token)
+
+        token = Palette.current.set(Palette(False))
+        try:
+            self.assertEqual("foo", Color.color("foo", "red"))
+
+        finally:
+            Palette.current.reset(token)
+
+    def test_stream_palette(self):
+        path = testdata.get_file("pout.txt")
+        s = FileStream(path)
+        self.assertFalse(s.get_palette().enabled)
+        s.close()
+
+        s = BufferedStream(io.StringIO())
+        self.assertFalse(s.get_palette().enabled)
+        self.assertTrue(s.get_palette() is s.get_palette())
+
+        # the file stream's palette is used even though the palette was
+        # enabled when pout.v was called
+        token = Palette.current.set(Palette())
+        try:
+            with pout.tofile(path):
+                pout.v({"foo": 1})
+
+        finally:
+            Palette.current.reset(token)
+
+        self.assertFalse("\033[" in path.read_text())
+
+    def test_benchmark(self):
+        """Times coloring with a palette, only runs when POUT_BENCHMARK is set
+        to the number of calls (eg, POUT_BENCHMARK=100000)"""
+        count = int(os.environ.get("POUT_BENCHMARK", 0))
+        if not count:
+            raise SkipTest("Set POUT_BENCHMARK=100000 to run the benchmark")
+
+        class PaletteStream(Stream):
+            def __init__(self, palette):
+                self.palette = palette
+
+            def writeline(self, s):
+                pass
+
+            def get_palette(self):
+                return self.palette
+
+        orig_stream = pout.stream
+        d = {f"key-{i}": [i, str(i), {"i": i}] for i in range(100)}
+        for name, palette in [("color", Palette()), ("plain", Palette(False))]:
+            pout.stream = PaletteStream(palette)
+            token = Palette.current.set(palette)
+            try:
+                start = time.perf_counter()
+                for i in range(count):
+                    Color.color_key("foo")
+                color_elapsed = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for i in range(10):
+                    pout.v(d)
+                v_elapsed = time.perf_counter() - start
+
+            finally:
+                Palette.current.reset(token)
+                pout.stream = orig_stream
+
+            print(
+                "{} {}: {:.2f} Color.color_key/s, {:.2f}ms per pout.v".format(
+                    count,
+                    name,
+                    count / color_elapsed,
+                    v_elapsed / 10 * 1000,
+                )
+            )
+
     def test_pout(self):
         """This doesn't test anything, it's just here for me to check colors"""
         def bar(one, two, three):
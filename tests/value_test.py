@@ -7,6 +7,9 @@ import datetime
 import uuid
 from collections import namedtuple
 import enum
+import dataclasses
+import fractions
+import sqlite3
 
 from . import testdata, TestCase
 
@@ -31,6 +34,8 @@ from pout.value import (
     RegexMatchValue,
     GeneratorValue,
     CallableValue,
+    FieldsValue,
+    Snapshot,
     Value,
 )
 
@@ -57,6 +62,23 @@ class ValueTest(TestCase):
         self.assertTrue("True" in r)
         self.assertTrue("<" in r)
 
+    def test_primitive_int_big(self):
+        v = Value(-(2 ** 4095 + 1), int_limit=100)
+        r = v.string_value()
+        self.assertTrue(r.startswith("-0x80000000..."), r)
+        self.assertTrue("...00000001" in r, r)
+        self.assertTrue("4096 bits" in r, r)
+        self.assertTrue("1233 digits" in r, r)
+        self.assertTrue("e+1232" in r, r)
+
+        v = Value(2 ** 4096, int_limit=0)
+        r = v.string_value()
+        self.assertFalse("0x" in r, r)
+
+        v = Value(12345, int_limit=3)
+        r = v.string_value()
+        self.assertTrue("0x3039 (14 bits, 5 digits" in r, r)
+
     def test_primitive_float(self):
         v = Value(123456.789, show_instance_type=True)
         r = v.string_value()
@@ -282,6 +304,69 @@ class ValueTest(TestCase):
 
         pout.v(d)
 
+    def test_sqlite_cursor(self):
+        con = sqlite3.connect(":memory:")
+        con.execute("CREATE TABLE foo (bar INTEGER, che TEXT)")
+        con.executemany(
+            "INSERT INTO foo VALUES (?, ?)",
+            [(i, f"che {i}") for i in range(10)]
+        )
+
+        v = Value(con.cursor())
+        self.assertEqual("<>", v.string_value())
+
+        cur = con.execute("SELECT * FROM foo")
+        s = Value(cur, iterate_limit=3).string_value()
+        self.assertTrue("Cursor (3)" in s, s)
+        self.assertTrue("bar | che\n" in s, s)
+        self.assertTrue("  2 | che 2" in s, s)
+        self.assertFalse("che 3" in s, s)
+        # the cursor fetched the truncation row
+        self.assertEqual((4, "che 4"), cur.fetchone())
+
+        con.row_factory = sqlite3.Row
+        cur = con.execute("SELECT * FROM foo")
+        s = Value(cur).string_value()
+        self.assertTrue("Cursor (10)" in s, s)
+        self.assertTrue("  9 | che 9" in s, s)
+
+    def test_sqlite_rows(self):
+        con = sqlite3.connect(":memory:")
+        con.row_factory = sqlite3.Row
+        rows = con.execute("SELECT 1 AS foo, 'two' AS bar").fetchall()
+        s = Value(rows).string_value()
+        self.assertTrue("foo | bar" in s, s)
+        self.assertTrue("  1 | two" in s, s)
+
+    def test_list_table(self):
+        rows = [{"foo": i, "bar": f"bar {i}"} for i in range(5)]
+        s = Value(rows, table=True).string_value()
+        self.assertTrue("foo | bar\n" in s, s)
+        self.assertTrue("  4 | bar 4" in s, s)
+
+        s = Value(rows).string_value()
+        self.assertFalse("foo | bar" in s, s)
+
+        Row = namedtuple("Row", ["foo", "bar"])
+        s = Value([Row(1, "one"), Row(20, None)], table=True).string_value()
+        self.assertTrue("  1 | one" in s, s)
+        self.assertTrue(" 20 | None" in s, s)
+
+        @dataclasses.dataclass
+        class Dataclass(object):
+            foo: int
+            text: str
+
+        rows = [Dataclass(i, "x" * i) for i in range(10)]
+        s = Value(rows, table=True, table_sample=2).string_value()
+        # widths are fixed by the first 2 rows, wider values get truncated
+        self.assertTrue("  9 | x...\n" in s, s)
+
+        # records with different keys aren't printed as a table
+        rows = [{"foo": 1}, {"bar": 2}]
+        s = Value(rows, table=True).string_value()
+        self.assertFalse("-+-" in s, s)
+
     def test_dictproxy(self):
         class FooDictProxy(object): pass
         v = Value(FooDictProxy.__dict__)
@@ -370,6 +455,19 @@ class ValueTest(TestCase):
         self.assertTrue("str (7)" in r, r)
         self.assertTrue("foo bar" in r, r)
 
+    def test_string_limit(self):
+        s = "a" * 10 + "b" * 100 + "c" * 10
+        r = Value(s, string_limit=20).string_value()
+        self.assertTrue("str (120)" in r, r)
+        self.assertTrue("aaaaaaaaaa... 100 chars omitted ...cccccccccc" in r)
+        self.assertFalse("bb" in r, r)
+
+        r = Value(s, string_limit=0).string_value()
+        self.assertTrue("b" * 100 in r)
+
+        r = Value({"foo": s}, string_limit=20).string_value()
+        self.assertTrue("100 chars omitted" in r, r)
+
     def test_bytes_1(self):
         v = Value(b"")
         self.assertTrue(isinstance(v, BytesValue))
@@ -412,6 +510,33 @@ class ValueTest(TestCase):
         r = v.string_value()
         self.assertTrue("b\"\"" in r, r)
 
+    def test_bytes_limit(self):
+        b = b"a" * 10 + b"b" * 100 + b"c" * 10
+        for val in [b, bytearray(b), memoryview(b)]:
+            r = Value(val, bytes_limit=20).string_value()
+            self.assertTrue("aaaaaaaaaa... 100 bytes omitted ...cccccccccc" in r)
+            self.assertFalse("b" * 2 in r, r)
+
+        r = Value(b, bytes_limit=0).string_value()
+        self.assertTrue("b" * 100 in r)
+
+        v = memoryview(array.array("I", [1, 2, 3, 4]))
+        r = Value(v, bytes_limit=8).string_value()
+        self.assertTrue("8 bytes omitted" in r, r)
+
+    def test_bytes_hexdump(self):
+        b = bytes(range(256))
+        r = Value(b, hexdump=True, bytes_limit=128).string_value()
+        self.assertTrue("00000000  00 01 02 03 04 05 06 07  08 09" in r, r)
+        self.assertTrue("... 128 bytes omitted ..." in r, r)
+        self.assertTrue("000000c0  c0 c1" in r, r)
+        self.assertTrue("|0123456789:;<=>?|" in r, r)
+        self.assertFalse("00000040" in r, r)
+
+        r = Value(b"foo", hexdump=True).string_value()
+        self.assertTrue("66 6f 6f" in r, r)
+        self.assertTrue("|foo|" in r, r)
+
     def test_exception(self):
         v = Value(ValueError("foo bar"))
         self.assertTrue(isinstance(v, ExceptionValue))
@@ -911,6 +1036,192 @@ class ValueTest(TestCase):
         self.assertTrue("0 bar" in s)
         self.assertTrue("1 che" in s)
 
+    def test_snapshot(self):
+        class Foo(object):
+            def __init__(self):
+                self.bar = [1, 2]
+                self.foo = self
+
+        foo = Foo()
+        d = {"foo": foo, "che": list(range(500)), "baz": (1, {2})}
+        snap = Snapshot.create(d, iterate_limit=10)
+        foo.bar.append(3)
+        d["che"].append(500)
+
+        self.assertEqual(500, len(snap["che"]))
+        self.assertEqual(11, len(list(iter(snap["che"]))))
+        self.assertTrue(snap["foo"].snapshot_attrs["foo"] is snap["foo"])
+
+        s = Value(snap, iterate_limit=10).string_value()
+        self.assertTrue("dict (3)" in s, s)
+        self.assertTrue("Truncated 490/500 rows" in s, s)
+        self.assertTrue("tuple (2)" in s, s)
+        self.assertTrue("Foo at 0x{:02x}".format(id(foo)) in s, s)
+        self.assertFalse("2: 3" in s, s)
+
+        # values deeper than the object depth only keep their type and id
+        snap = Snapshot.create([[[1]]], object_depth=2)
+        s = Value(snap).string_value()
+        self.assertTrue("<list (1) at 0x" in s, s)
+
+    def test_snapshot_render(self):
+        """snapshots render the same as the values they were taken from"""
+        Point = namedtuple("Point", "x y")
+        vals = [
+            {frozenset({1}): 1},
+            {frozenset({1})},
+            Point(1, [2, 3]),
+            memoryview(array.array("i", range(3000))),
+            array.array("i", range(500)),
+            bytearray(b"short"),
+        ]
+        for val in vals:
+            self.assertEqual(
+                Value(val).string_value(),
+                Value(Snapshot.create(val)).string_value(),
+            )
+
+    def test_snapshot_object(self):
+        """objects keep their repr and __str__ in the snapshot"""
+        @dataclasses.dataclass(frozen=True)
+        class K(object):
+            a: int
+
+        val = {K(1): [1, 2]}
+        self.assertEqual(
+            Value(val).string_value(),
+            Value(Snapshot.create(val)).string_value(),
+        )
+
+        class Foo(object):
+            def __init__(self):
+                self.bar = 1
+
+            def __str__(self):
+                return "foo " * 200
+
+        foo = Foo()
+        s = Value(Snapshot.create(foo)).string_value()
+        foo.bar = 2
+        self.assertTrue("__str__ (800)" in s, s)
+        self.assertTrue("Truncated 300/800 chars" in s, s)
+        self.assertTrue("bar = 1" in s, s)
+        self.assertTrue("builtins:object" in s, s)
+
+    def test_snapshot_bytes(self):
+        val = bytearray(range(256)) * 100
+        snap = Snapshot.create(val, bytes_limit=100)
+        self.assertGreater(200, len(bytes(snap)))
+        self.assertEqual(len(val), len(snap))
+
+        for hexdump in [False, True]:
+            self.assertEqual(
+                Value(val, bytes_limit=100, hexdump=hexdump).string_value(),
+                Value(snap, bytes_limit=100, hexdump=hexdump).string_value(),
+            )
+
+    def test_snapshot_fallback(self):
+        """a set item whose snapshot can't be hashed becomes its repr"""
+        class Foo(dict):
+            def __hash__(self):
+                return 1
+
+            def __repr__(self):
+                return "<Foo>"
+
+        snap = Snapshot.create({1: {Foo()}, 2: frozenset([Foo()])})
+        self.assertEqual({"<Foo>"}, set(snap[1]))
+        self.assertEqual({"<Foo>"}, set(snap[2]))
+
+    def test_fields_slots(self):
+        class Parent(object):
+            __slots__ = ("foo", "__bar")
+
+        class Child(Parent):
+            __slots__ = "che"
+
+            @property
+            def baz(self):
+                raise RuntimeError("properties should not be evaluated")
+
+        c = Child()
+        c.foo = 1
+        c.che = 3
+        c._Parent__bar = 2
+        v = Value(c)
+        self.assertTrue(isinstance(v, FieldsValue))
+        s = v.string_value()
+        self.assertTrue("Child (3)" in s, s)
+        self.assertTrue("foo = 1" in s, s)
+        self.assertTrue("_Parent__bar = 2" in s, s)
+        self.assertTrue("che = 3" in s, s)
+        self.assertTrue("baz = <property>" in s, s)
+        self.assertFalse("RuntimeError" in s, s)
+
+        del c.che
+        s = Value(c).string_value()
+        self.assertFalse("che = 3" in s, s)
+
+        class Dict(Parent):
+            pass
+        self.assertFalse(isinstance(Value(Dict()), FieldsValue))
+
+        self.assertFalse(isinstance(Value(Path("/foo")), FieldsValue))
+        self.assertFalse(isinstance(Value(uuid.uuid4()), FieldsValue))
+
+    def test_fields_dataclass(self):
+        @dataclasses.dataclass
+        class Foo(object):
+            bar: int
+            che: str = "che"
+
+            def __post_init__(self):
+                self.extra = 5
+
+        v = Value(Foo(1))
+        self.assertTrue(isinstance(v, FieldsValue))
+        s = v.string_value()
+        self.assertRegex(s, r"bar = 1\n.+che = str")
+        self.assertEqual(("bar", "che"), FieldsValue.get_fields(Foo))
+
+        # attributes that aren't fields, the __str__ and the class hierarchy
+        # are still printed
+        self.assertTrue("extra = 5" in s, s)
+        self.assertTrue("__str__ (" in s, s)
+        self.assertTrue("builtins:object" in s, s)
+
+    def test_fields_order(self):
+        """types with their own value class aren't handled as fields"""
+        @dataclasses.dataclass
+        class E(Exception):
+            code: int
+
+        try:
+            raise E(1)
+
+        except E as e:
+            v = Value(e)
+            self.assertTrue(isinstance(v, ExceptionValue))
+
+        v = Value(fractions.Fraction(1, 3))
+        self.assertFalse(isinstance(v, FieldsValue))
+
+    def test_fields_attrs(self):
+        class Attribute(object):
+            def __init__(self, name):
+                self.name = name
+
+        class Foo(object):
+            __attrs_attrs__ = (Attribute("bar"), Attribute("che"))
+            def __init__(self):
+                self.bar = 1
+                self.che = 2
+                self.baz = 3
+
+        s = Value(Foo()).string_value()
+        self.assertTrue("bar = 1" in s, s)
+        self.assertTrue("baz = 3" in s, s)
+
     def test_enum(self):
         class Foo1(enum.Enum):
             BAR = 1